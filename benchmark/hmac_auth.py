@@ -0,0 +1,132 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""Measure the cost of HMAC authentication for requests with large bodies and
+report it as JSON: verifying a request, signing a response, and a whole
+/open_document request going through HmacPlugin, without any network."""
+
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+from jedihttp import utils
+utils.add_vendor_folder_to_sys_path()
+
+import json
+import platform
+import timeit
+from argparse import ArgumentParser
+from io import BytesIO
+from jedihttp import handlers, hmaclib
+from jedihttp.compatibility import encode_string
+from jedihttp.hmac_plugin import HmacPlugin
+
+SECRET = b'secret'
+PATH = '/open_document'
+
+
+def parse_args():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--body-bytes', type=int, default=900 * 1024,
+                        help='size of the request bodies, at most the '
+                        'maximum size of a request')
+    parser.add_argument('--iterations', type=int, default=100,
+                        help='number of measured runs of each operation')
+    parser.add_argument('--output', type=str,
+                        help='file where the JSON report is written; default '
+                        'is the standard output')
+    return parser.parse_args()
+
+
+def request_body(size):
+    request_data = {'source_path': '/benchmark.py', 'source': ''}
+    padding = size - len(json.dumps(request_data))
+    request_data['source'] = 'x' * max(0, padding)
+    return encode_string(json.dumps(request_data))
+
+
+def wsgi_request(app, body, headers):
+    environ = {
+        'REQUEST_METHOD': 'POST',
+        'PATH_INFO': PATH,
+        'SERVER_NAME': '127.0.0.1',
+        'SERVER_PORT': '80',
+        'HTTP_HOST': '127.0.0.1',
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': BytesIO(body),
+        'wsgi.url_scheme': 'http'
+    }
+    for name, value in headers.items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
+
+    def start_response(status, response_headers, exc_info=None):
+        if not status.startswith('200'):
+            raise RuntimeError('Request failed with status {0}.'.format(
+                status))
+
+    return b''.join(app(environ, start_response))
+
+
+def measure(function, iterations):
+    """Return the mean and minimum duration of |function| in
+    milliseconds."""
+    function()
+    durations = timeit.repeat(function, number=1, repeat=iterations)
+    return {
+        'mean_ms': sum(durations) / len(durations) * 1000,
+        'min_ms': min(durations) * 1000
+    }
+
+
+def main():
+    args = parse_args()
+    body = request_body(args.body_bytes)
+    hmachelper = hmaclib.JediHTTPHmacHelper(SECRET)
+    headers = {}
+    hmachelper.sign_request_headers(headers, 'POST', PATH, body)
+
+    handlers.app.config['jedihttp.hmac_secret'] = SECRET
+    handlers.app.install(HmacPlugin())
+
+    results = {
+        'verify_request': measure(
+            lambda: hmachelper.is_request_authenticated(headers,
+                                                        'POST',
+                                                        PATH,
+                                                        body),
+            args.iterations),
+        'sign_response': measure(
+            lambda: hmachelper.sign_response_headers({}, body),
+            args.iterations),
+        'request': measure(
+            lambda: wsgi_request(handlers.app, body, headers),
+            args.iterations)
+    }
+
+    output = json.dumps({
+        'python': platform.python_version(),
+        'body_bytes': len(body),
+        'iterations': args.iterations,
+        'results': results
+    }, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,398 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""Replay a mix of requests against a JediHTTP server started from this tree
+and report latency percentiles, throughput and peak memory as JSON.
+
+Requests are generated from a corpus of Python files with a fixed seed so that
+runs with the same options on the same corpus send the same requests and can
+be compared across commits. The corpus must not change between the compared
+runs, e.g. a checkout of a given version of a package; its digest is part of
+the report."""
+
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+import hashlib
+import json
+import math
+import platform
+import random
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from argparse import ArgumentParser
+from jedihttp import hmaclib
+from jedihttp.compatibility import decode_string, encode_string, queue
+
+import requests
+
+PATH_TO_JEDIHTTP = os.path.join(ROOT, 'jedihttp')
+SECRET = 'secret'
+IDENTIFIER = re.compile(r'[A-Za-z_]\w*')
+
+
+class HmacAuth(requests.auth.AuthBase):
+    def __init__(self, secret):
+        self._hmac_helper = hmaclib.JediHTTPHmacHelper(secret)
+
+    def __call__(self, req):
+        self._hmac_helper.sign_request_headers(req.headers,
+                                               req.method,
+                                               req.path_url,
+                                               req.body)
+        return req
+
+
+def parse_args():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--corpus', type=str, required=True,
+                        help='directory of the Python files requests are made '
+                        'on, e.g. a checkout of a fixed version of a package')
+    parser.add_argument('--mix', type=str,
+                        default='completions=4,gotodefinition=2,usages=1,'
+                        'names=1',
+                        help='relative weights of the endpoints')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='number of measured requests')
+    parser.add_argument('--warmup-requests', type=int, default=20,
+                        help='number of requests sent before measuring')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='number of clients sending requests at once')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the generated requests')
+    parser.add_argument('--port', type=int, default=50001,
+                        help='port of the server')
+    parser.add_argument('--hmac', action='store_true',
+                        help='authenticate requests with HMAC')
+    parser.add_argument('--keep-alive', action='store_true',
+                        help='reuse one connection per client instead of '
+                        'opening a connection for each request')
+    parser.add_argument('--python', type=str, default=sys.executable,
+                        help='interpreter running the server')
+    parser.add_argument('--server-args', type=str, default='',
+                        help='extra arguments of the server, e.g. '
+                        '"--workers 2"')
+    parser.add_argument('--output', type=str,
+                        help='file where the JSON report is written; default '
+                        'is the standard output')
+    return parser.parse_args()
+
+
+def parse_mix(mix):
+    weights = []
+    for entry in mix.split(','):
+        endpoint, weight = entry.split('=')
+        weights.append((endpoint.strip(), int(weight)))
+    return weights
+
+
+def read_corpus(corpus):
+    sources = []
+    for directory, _, filenames in os.walk(corpus):
+        for filename in sorted(filenames):
+            if not filename.endswith('.py'):
+                continue
+            path = os.path.join(directory, filename)
+            with open(path) as source_file:
+                source = source_file.read()
+            try:
+                compile(source, path, 'exec')
+            except (SyntaxError, ValueError):
+                continue
+            sources.append((path, source))
+    return sorted(sources)
+
+
+def corpus_digest(corpus, sources):
+    """Return a digest of the paths, relative to |corpus|, and the contents of
+    |sources| identifying the requests generated from them."""
+    digest = hashlib.sha1()
+    for path, source in sources:
+        digest.update(encode_string(os.path.relpath(path, corpus)))
+        digest.update(b'\0')
+        digest.update(encode_string(source))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def identifier_positions(source):
+    """Return the line (starting with 1) and column (starting with 0) of the
+    end of each identifier in |source|."""
+    positions = []
+    for line_number, line in enumerate(source.splitlines(), 1):
+        for match in IDENTIFIER.finditer(line):
+            positions.append((line_number, match.end()))
+    return positions
+
+
+def generate_requests(sources, mix, count, seed):
+    generator = random.Random(seed)
+    endpoints = [endpoint for endpoint, weight in mix for _ in range(weight)]
+    positions = [identifier_positions(source) for _, source in sources]
+    generated = []
+    while len(generated) < count:
+        index = generator.randrange(len(sources))
+        if not positions[index]:
+            continue
+        path, source = sources[index]
+        endpoint = generator.choice(endpoints)
+        if endpoint == 'names':
+            generated.append((endpoint, {'source': source, 'path': path}))
+            continue
+        line, col = generator.choice(positions[index])
+        generated.append((endpoint, {'source': source,
+                                     'line': line,
+                                     'col': col,
+                                     'source_path': path}))
+    return generated
+
+
+def start_server(args):
+    command = [args.python, PATH_TO_JEDIHTTP, '--port', str(args.port)]
+    if args.hmac:
+        command += ['--hmac-file-secret',
+                    hmaclib.temporary_hmac_secret_file(SECRET)]
+    command += args.server_args.split()
+    # The output of the server is only shown if it fails to start. It is not
+    # piped since nothing reads it while the requests are sent.
+    log = tempfile.TemporaryFile()
+    server = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        wait_until_ready(args, server)
+    except RuntimeError:
+        if server.poll() is None:
+            server.kill()
+            server.wait()
+        log.seek(0)
+        sys.stderr.write(decode_string(log.read()))
+        raise
+    return server
+
+
+def post(args, endpoint, request_data=None, session=requests):
+    return session.post('http://127.0.0.1:{0}/{1}'.format(args.port,
+                                                          endpoint),
+                        json=request_data or {},
+                        auth=HmacAuth(SECRET) if args.hmac else None)
+
+
+def wait_until_ready(args, server, timeout=30):
+    expiration = time.time() + timeout
+    while time.time() < expiration:
+        if server.poll() is not None:
+            raise RuntimeError('JediHTTP exited with code '
+                               '{0}.'.format(server.returncode))
+        try:
+            if post(args, 'ready').json():
+                return
+        except requests.exceptions.ConnectionError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError('Waited for JediHTTP to be ready for {0} seconds, '
+                       'aborting.'.format(timeout))
+
+
+def stop_server(args, server):
+    try:
+        post(args, 'shutdown')
+    except requests.exceptions.ConnectionError:
+        pass
+    server.wait()
+
+
+def _status_value(pid, field):
+    try:
+        with open('/proc/{0}/status'.format(pid)) as status:
+            for line in status:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except (IOError, OSError):
+        pass
+    return None
+
+
+def _descendants(pid):
+    """Return the pids of the children of the process |pid|, of their
+    children, and so on."""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open('/proc/{0}/stat'.format(entry)) as stat:
+                # The parent pid is the 2nd field after the command name,
+                # which is between parentheses and may contain spaces.
+                fields = stat.read().rsplit(')', 1)[1].split()
+        except (IOError, OSError, IndexError):
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+    descendants = []
+    pending = [pid]
+    while pending:
+        for child in children.get(pending.pop(), []):
+            descendants.append(child)
+            pending.append(child)
+    return descendants
+
+
+def peak_rss_kb(pid):
+    """Return the sum of the peak resident set sizes of the process |pid| and
+    of all its descendants, in kilobytes. Workers are not children of the
+    server: they are forked by the forkserver process on Python 3, or by a
+    spare process on Python 2. Only supported on Linux."""
+    if not os.path.isdir('/proc'):
+        return None
+    total = _status_value(pid, 'VmHWM')
+    if total is None:
+        return None
+    for descendant in _descendants(pid):
+        total += _status_value(descendant, 'VmHWM') or 0
+    return total
+
+
+def send_requests(args, generated):
+    """Send |generated| requests with |args.concurrency| clients and return
+    the list of (endpoint, latency in seconds, succeeded) tuples."""
+    pending = queue.Queue()
+    for request in generated:
+        pending.put(request)
+    results = []
+    results_lock = threading.Lock()
+
+    def client():
+        # A session keeps its connection open between requests.
+        session = requests.Session() if args.keep_alive else requests
+        while True:
+            try:
+                endpoint, request_data = pending.get_nowait()
+            except queue.Empty:
+                return
+            start = time.time()
+            try:
+                succeeded = post(args, endpoint, request_data, session).ok
+            except requests.exceptions.RequestException:
+                succeeded = False
+            latency = time.time() - start
+            with results_lock:
+                results.append((endpoint, latency, succeeded))
+
+    clients = [threading.Thread(target=client)
+               for _ in range(args.concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    return results
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of |sorted_values|: the smallest value greater
+    than or equal to |fraction| of the values."""
+    if not sorted_values:
+        return None
+    count = len(sorted_values)
+    rank = min(max(int(math.ceil(fraction * count)), 1), count)
+    return sorted_values[rank - 1]
+
+
+def summarize(results):
+    latencies = sorted(latency * 1000 for _, latency, _ in results)
+    return {
+        'count': len(results),
+        'errors': len([result for result in results if not result[2]]),
+        'mean_ms': sum(latencies) / len(latencies) if latencies else None,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99)
+    }
+
+
+def git_revision():
+    try:
+        git = subprocess.Popen(['git', 'rev-parse', 'HEAD'],
+                               cwd=ROOT,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE)
+    except OSError:
+        return None
+    revision = decode_string(git.communicate()[0]).strip()
+    return revision if git.returncode == 0 else None
+
+
+def report(args, digest, results, duration, rss):
+    endpoints = sorted(set(endpoint for endpoint, _, _ in results))
+    return {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'corpus_digest': digest,
+        'options': {
+            'corpus': args.corpus,
+            'mix': args.mix,
+            'requests': args.requests,
+            'warmup_requests': args.warmup_requests,
+            'concurrency': args.concurrency,
+            'seed': args.seed,
+            'hmac': args.hmac,
+            'keep_alive': args.keep_alive,
+            'server_args': args.server_args
+        },
+        'duration_s': duration,
+        'throughput_rps': len(results) / duration if duration else None,
+        'peak_rss_kb': rss,
+        'overall': summarize(results),
+        'endpoints': dict(
+            (endpoint, summarize([result for result in results
+                                  if result[0] == endpoint]))
+            for endpoint in endpoints)
+    }
+
+
+def main():
+    args = parse_args()
+    sources = read_corpus(args.corpus)
+    if not sources:
+        sys.exit('No Python file found in {0}.'.format(args.corpus))
+    generated = generate_requests(sources,
+                                  parse_mix(args.mix),
+                                  args.warmup_requests + args.requests,
+                                  args.seed)
+
+    server = start_server(args)
+    try:
+        send_requests(args, generated[:args.warmup_requests])
+        start = time.time()
+        results = send_requests(args, generated[args.warmup_requests:])
+        duration = time.time() - start
+        rss = peak_rss_kb(server.pid)
+    finally:
+        stop_server(args, server)
+
+    digest = corpus_digest(args.corpus, sources)
+    output = json.dumps(report(args, digest, results, duration, rss),
+                        indent=2,
+                        sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -19,22 +19,47 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
 from jedihttp import utils
 utils.add_vendor_folder_to_sys_path()
 
-import logging
 import json
 from base64 import b64decode
 from argparse import ArgumentParser
 from jedihttp import handlers
+from jedihttp.compression_plugin import CompressionPlugin
+from jedihttp.file_watcher import FileWatcher
 from jedihttp.hmac_plugin import HmacPlugin
+from jedihttp.metrics_plugin import MetricsPlugin
+from jedihttp.process_setup import set_up_jedi, set_up_logging, set_up_worker
+from jedihttp.profiler_plugin import ProfilerPlugin
+from jedihttp.symbol_index import SymbolIndex
+from jedihttp.warmup import read_modules
 from jedihttp.watchdog_plugin import WatchdogPlugin
-from jedihttp.wsgi_server import StoppableWSGIServer
+from jedihttp.workers import WorkerPool
+from jedihttp import wsgi_server
 
 
 def parse_args():
     parser = ArgumentParser()
+    parser.add_argument('--config', type=str,
+                        help='JSON file of option values keyed by option '
+                        'name; options given on the command line take '
+                        'precedence')
     parser.add_argument('--host', type=str, default='127.0.0.1',
                         help='server host')
     parser.add_argument('--port', type=int, default=0,
                         help='server port')
+    parser.add_argument('--unix-socket', type=str,
+                        help='path of a Unix socket to listen on instead of '
+                        '--host and --port; only the user running the server '
+                        'can connect to it')
+    parser.add_argument('--threads', type=int, default=4,
+                        help='number of threads handling the requests')
+    parser.add_argument('--channel-timeout', type=int, default=120,
+                        help='number of seconds after which an inactive '
+                        'connection is closed')
+    parser.add_argument('--backlog', type=int, default=1024,
+                        help='maximum number of pending connections')
+    parser.add_argument('--connection-limit', type=int, default=100,
+                        help='maximum number of open connections; new '
+                        'connections wait once it is reached')
     parser.add_argument('--log', type=str, default='info',
                         choices=['debug', 'info', 'warning', 'error',
                                  'critical'],
@@ -45,17 +70,88 @@ def parse_args():
                         help='number of idle seconds before server shuts down')
     parser.add_argument('--check-interval-seconds', type=int, default=600,
                         help='interval in seconds to check server inactivity')
-    return parser.parse_args()
+    parser.add_argument('--workers', type=int, default=0,
+                        help='number of Jedi worker processes; 0 runs Jedi in '
+                        'the server process')
+    parser.add_argument('--script-cache-size', type=int, default=8,
+                        help='number of parsed scripts kept in memory by each '
+                        'Jedi process')
+    parser.add_argument('--script-cache-source-bytes', type=int,
+                        default=16 * 1024 * 1024,
+                        help='maximum total size in bytes of the sources of '
+                        'the parsed scripts kept by each Jedi process; the '
+                        'memory used by the scripts is several times larger')
+    parser.add_argument('--completion-cache-size', type=int, default=8,
+                        help='number of completion results kept in memory by '
+                        'each Jedi process to answer the next keystrokes')
+    parser.add_argument('--warmup-from', type=str,
+                        help='file recording the modules resolved during '
+                        'previous sessions; they are preloaded in the '
+                        'background on startup and the file is updated on '
+                        'shutdown')
+    parser.add_argument('--settings-profiles', type=str,
+                        help='JSON file mapping names of settings profiles to '
+                        'Jedi settings; requests select a profile with their '
+                        'settings_profile parameter')
+    parser.add_argument('--project-root', type=str,
+                        help='root directory of the project whose symbols '
+                        'are indexed in the background for '
+                        '/workspace_symbols')
+    parser.add_argument('--index-file', type=str,
+                        help='file where the symbol index of --project-root '
+                        'is saved so that only modified files are indexed '
+                        'again on restart')
+    parser.add_argument('--watch', action='store_true',
+                        help='watch the files of --project-root and update '
+                        'the symbol index and the caches when they change')
+    parser.add_argument('--max-watches', type=int, default=4096,
+                        help='maximum number of directories watched with '
+                        'inotify; files are polled if there are more')
+    parser.add_argument('--compression-threshold', type=int,
+                        help='minimum size in bytes of the responses '
+                        'compressed when the client accepts it; responses '
+                        'are not compressed if not set')
+    parser.add_argument('--profile-dir', type=str,
+                        help='directory where the cProfile statistics of '
+                        'profiled requests are written; requests with the '
+                        'X-JediHTTP-Profile header are profiled')
+    parser.add_argument('--profile-sample-rate', type=float, default=0.0,
+                        help='fraction of the requests profiled without the '
+                        'X-JediHTTP-Profile header when --profile-dir is set')
+    args = parser.parse_args()
+    if args.config:
+        parser.set_defaults(**read_config(args.config, vars(args)))
+        args = parser.parse_args()
+    if args.watch and not args.project_root:
+        parser.error('--watch requires --project-root')
+    return args
 
 
-def set_up_logging(log_level):
-    numeric_level = getattr(logging, log_level.upper(), None)
-    if not isinstance(numeric_level, int):
-        raise ValueError('Invalid log level: {0}'.format(log_level))
+def read_config(config_file, options):
+    """Return the option values read from the JSON file |config_file|. Its
+    keys are option names without the leading dashes, e.g. "channel-timeout",
+    and must be in |options|."""
+    try:
+        with open(config_file) as config:
+            data = json.load(config)
+    except (IOError, OSError) as error:
+        sys.exit('Cannot read the config file {0}: {1}'.format(config_file,
+                                                               error))
+    except ValueError:
+        sys.exit('A JSON object was expected in the config file '
+                 '{0}.'.format(config_file))
+    if not isinstance(data, dict):
+        sys.exit('A JSON object was expected in the config file '
+                 '{0}.'.format(config_file))
 
-    # Has to be called before any call to logging.getLogger().
-    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s',
-                        level=numeric_level)
+    values = {}
+    for name, value in data.items():
+        option = name.replace('-', '_')
+        if option not in options or option == 'config':
+            sys.exit('Unknown option {0} in the config file '
+                     '{1}.'.format(name, config_file))
+        values[option] = value
+    return values
 
 
 def get_secret_from_temp_file(tfile):
@@ -73,22 +169,89 @@ def get_secret_from_temp_file(tfile):
     return hmac_secret
 
 
+def create_server(args):
+    options = {
+        'threads': args.threads,
+        'channel_timeout': args.channel_timeout,
+        'backlog': args.backlog,
+        'connection_limit': args.connection_limit
+    }
+    if not args.unix_socket:
+        return wsgi_server.StoppableWSGIServer(handlers.app,
+                                               host=args.host,
+                                               port=args.port,
+                                               **options)
+    if not hasattr(wsgi_server, 'StoppableUnixWSGIServer'):
+        sys.exit('Unix sockets are not supported on this platform.')
+    return wsgi_server.StoppableUnixWSGIServer(handlers.app,
+                                               args.unix_socket,
+                                               **options)
+
+
+def set_up_project(args):
+    """Index the project in the background and watch its files if
+    requested."""
+    handlers.symbol_index = SymbolIndex(
+        args.project_root,
+        args.index_file,
+        lambda: handlers.interactive_requests.wait_idle(
+            handlers.PRELOAD_IDLE_TIMEOUT))
+    handlers.symbol_index.start()
+
+    if args.watch:
+        file_watcher = FileWatcher(args.project_root,
+                                   max_watches=args.max_watches)
+        file_watcher.subscribe(handlers.invalidate_paths)
+        file_watcher.start()
+
+
 def main():
     args = parse_args()
 
     set_up_logging(args.log)
 
+    # Installed first so that it wraps the other plugins.
+    handlers.app.install(MetricsPlugin())
+
     if args.hmac_file_secret:
         hmac_secret = get_secret_from_temp_file(args.hmac_file_secret)
         handlers.app.config['jedihttp.hmac_secret'] = b64decode(hmac_secret)
-        handlers.app.install(HmacPlugin())
+        handlers.app.install(HmacPlugin(check_host=not args.unix_socket))
 
     handlers.app.install(WatchdogPlugin(args.idle_suicide_seconds,
                                         args.check_interval_seconds))
 
-    handlers.wsgi_server = StoppableWSGIServer(handlers.app,
-                                               host=args.host,
-                                               port=args.port)
+    # Installed after HmacPlugin so that HMACs are computed over the
+    # compressed bodies.
+    handlers.app.install(CompressionPlugin(args.compression_threshold))
+
+    # Installed last so that only the handlers are profiled.
+    if args.profile_dir:
+        handlers.app.install(ProfilerPlugin(args.profile_dir,
+                                            args.profile_sample_rate))
+
+    if args.settings_profiles:
+        try:
+            handlers.settings_profiles.load(args.settings_profiles)
+        except (IOError, OSError, ValueError) as error:
+            sys.exit('Cannot load the settings profiles from {0}: {1}'.format(
+                args.settings_profiles, error))
+
+    set_up_jedi(args)
+    if args.workers > 0:
+        handlers.jedi_pool = WorkerPool(args.workers,
+                                        initializer=set_up_worker,
+                                        initargs=(args,))
+
+    if args.warmup_from:
+        handlers.warmup_file = args.warmup_from
+        handlers.warmup_job = handlers.preload_queue.submit(
+            read_modules(args.warmup_from))
+
+    if args.project_root:
+        set_up_project(args)
+
+    handlers.wsgi_server = create_server(args)
     handlers.wsgi_server.start()
 
 
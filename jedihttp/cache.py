@@ -0,0 +1,91 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from jedihttp.compatibility import OrderedDict
+
+
+class LruCache(object):
+    """Least recently used cache holding at most |max_entries| entries whose
+    sizes add up to at most |max_bytes| bytes. The size of an entry is given
+    when it is put in the cache. A |max_bytes| of None means no byte budget.
+    This class is not thread safe."""
+
+    def __init__(self, max_entries, max_bytes=None):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        try:
+            value, size = self._entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        # Reinserting the entry marks it as the most recently used.
+        self._entries[key] = (value, size)
+        self.hits += 1
+        return value
+
+    def put(self, key, value, size=0):
+        self.pop(key)
+        if (self._max_entries <= 0 or
+                (self._max_bytes is not None and size > self._max_bytes)):
+            return
+        self._entries[key] = (value, size)
+        self._bytes += size
+        self._evict()
+
+    def pop(self, key, default=None):
+        try:
+            value, size = self._entries.pop(key)
+        except KeyError:
+            return default
+        self._bytes -= size
+        return value
+
+    def invalidate(self, predicate):
+        """Remove the entries for which |predicate| called with their key and
+        value is true and return how many were removed."""
+        keys = [key for key, (value, _) in self._entries.items()
+                if predicate(key, value)]
+        for key in keys:
+            self.pop(key)
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def _evict(self):
+        while (len(self._entries) > self._max_entries or
+               (self._max_bytes is not None and
+                self._bytes > self._max_bytes)):
+            _, (_, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes':   self._bytes,
+            'hits':    self.hits,
+            'misses':  self.misses
+        }
@@ -0,0 +1,108 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""Encoding and decoding of the requests and responses. JSON is encoded with
+the fastest library available: orjson, then ujson, then the json module.
+MessagePack is supported if the msgpack package is installed.
+
+dumps(data) returns |data| encoded as UTF-8 JSON bytes. Only plain data (dicts
+with string keys, lists, strings, numbers, booleans and None) can be encoded.
+loads(content) returns the data encoded as JSON in |content|, bytes or string,
+and raises ValueError if it is not valid JSON."""
+
+import json
+from jedihttp.compatibility import decode_string, encode_string
+from jedihttp.utils import parse_header_qualities
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_MIME_TYPE = 'application/json'
+MSGPACK_MIME_TYPE = 'application/msgpack'
+_MSGPACK_MIME_TYPES = (MSGPACK_MIME_TYPE, 'application/x-msgpack')
+
+
+def _ujson_dumps(data):
+    return encode_string(ujson.dumps(data, ensure_ascii=False))
+
+
+def _ujson_loads(content):
+    return ujson.loads(decode_string(content))
+
+
+def _json_dumps(data):
+    return encode_string(json.dumps(data, ensure_ascii=False))
+
+
+def _json_loads(content):
+    return json.loads(decode_string(content))
+
+
+if orjson is not None:
+    NAME = 'orjson'
+    dumps, loads = orjson.dumps, orjson.loads
+elif ujson is not None:
+    NAME = 'ujson'
+    dumps, loads = _ujson_dumps, _ujson_loads
+else:
+    NAME = 'json'
+    dumps, loads = _json_dumps, _json_loads
+
+
+def is_msgpack(content_type):
+    """Return whether |content_type|, the Content-Type header of a request, is
+    MessagePack."""
+    mime_type = (content_type or '').split(';')[0].strip().lower()
+    return mime_type in _MSGPACK_MIME_TYPES
+
+
+def accepts_msgpack(accept):
+    """Return whether the response to a request with the Accept header
+    |accept| should be encoded with MessagePack. JSON is preferred unless
+    MessagePack is explicitly accepted with at least the same quality."""
+    if msgpack is None:
+        return False
+    qualities = parse_header_qualities(accept)
+    msgpack_quality = max(qualities.get(mime_type, 0.0)
+                          for mime_type in _MSGPACK_MIME_TYPES)
+    json_quality = qualities.get(JSON_MIME_TYPE,
+                                 qualities.get('application/*',
+                                               qualities.get('*/*', 0.0)))
+    return msgpack_quality > 0 and msgpack_quality >= json_quality
+
+
+def msgpack_dumps(data):
+    """Return |data| encoded with MessagePack. Strings are encoded as the str
+    type and bytes as the bin type."""
+    return msgpack.packb(data, use_bin_type=True)
+
+
+def msgpack_loads(content):
+    """Return the data encoded with MessagePack in |content|. Raise ValueError
+    if it is not valid MessagePack."""
+    try:
+        return msgpack.unpackb(content, raw=False)
+    except Exception as error:
+        raise ValueError('Invalid MessagePack content: {0}'.format(error))
@@ -76,3 +76,17 @@ else:
 
     def iteritems(dictionary):
         return dictionary.iteritems()
+
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    # Python 2.6
+    from ordereddict import OrderedDict  # noqa
+
+
+try:
+    import queue
+except ImportError:
+    # Python 2
+    import Queue as queue  # noqa
@@ -0,0 +1,86 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import hashlib
+import json
+import re
+from jedihttp.cache import LruCache
+from jedihttp.compatibility import encode_string
+from jedihttp.documents import offset_of
+from jedihttp.filtering import filter_items
+
+_WORD_BEFORE_CURSOR = re.compile(r'\w*$', re.UNICODE)
+
+
+def _split_request(request_data):
+    """Return the cache key of a completion request and the word typed before
+    the cursor. The key identifies the position where the typed word starts
+    and the buffer around the typed word, which stays the same while the user
+    keeps typing it."""
+    source = request_data['source']
+    line = request_data['line']
+    cursor = offset_of(source, line, request_data['col'])
+    line_start = offset_of(source, line, 0)
+    word = _WORD_BEFORE_CURSOR.search(source, line_start, cursor).group()
+    start = cursor - len(word)
+
+    digest = hashlib.sha1(encode_string(source[:start]))
+    digest.update(b'\0')
+    digest.update(encode_string(source[cursor:]))
+    key = (request_data['source_path'],
+           line,
+           start - line_start,
+           digest.hexdigest(),
+           json.dumps(request_data.get('settings'), sort_keys=True))
+    return key, word
+
+
+class CompletionCache(object):
+    """Cache of the completions of the word being typed. The candidates can
+    only shrink as the user types more characters of the word, so completions
+    for a word that extends a cached one are obtained by filtering the cached
+    completions instead of asking Jedi again."""
+
+    def __init__(self, max_entries):
+        self._cache = LruCache(max_entries)
+
+    def get(self, request_data, case_sensitive=True):
+        key, word = _split_request(request_data)
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        cached_word, completions, _ = entry
+        if case_sensitive:
+            extends = word.startswith(cached_word)
+        else:
+            extends = word.lower().startswith(cached_word.lower())
+        if not extends:
+            return None
+        return filter_items(completions, word, case_sensitive=case_sensitive)
+
+    def put(self, request_data, completions, module_paths=()):
+        """Cache |completions| of the request. |module_paths| are the paths
+        of the modules loaded by Jedi to find them."""
+        key, word = _split_request(request_data)
+        paths = frozenset(module_paths) | frozenset([key[0]])
+        self._cache.put(key, (word, completions, paths))
+
+    def invalidate(self, paths):
+        """Remove the cached completions of a file of |paths| or depending on
+        one of them, and return how many were removed."""
+        def depends_on_paths(key, entry):
+            return not entry[2].isdisjoint(paths)
+        return self._cache.invalidate(depends_on_paths)
+
+    def stats(self):
+        return self._cache.stats()
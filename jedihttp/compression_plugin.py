@@ -0,0 +1,121 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import zlib
+from bottle import request, response, abort
+from jedihttp.utils import (REQUEST_BODY_KEY, parse_header_qualities,
+                            request_body)
+
+try:
+    import httplib
+except ImportError:
+    from http import client as httplib
+
+# zlib window bits of each supported encoding. "deflate" is the zlib format.
+_WBITS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS
+}
+
+
+def accepted_encoding(header):
+    """Return the encoding to use for a response given the Accept-Encoding
+    |header| of the request, or None if the response must not be encoded.
+    gzip is preferred to deflate."""
+    qualities = parse_header_qualities(header)
+    best = None
+    best_quality = 0.0
+    for encoding in ('gzip', 'deflate'):
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(content, encoding):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, _WBITS[encoding])
+    return compressor.compress(content) + compressor.flush()
+
+
+class ContentTooLarge(ValueError):
+    pass
+
+
+def decompress(content, encoding, max_bytes=None):
+    """Decompress |content| encoded with |encoding|. Raise ValueError if it is
+    not valid or truncated, and ContentTooLarge if it is larger than
+    |max_bytes|, if given, once decompressed."""
+    decompressor = zlib.decompressobj(_WBITS[encoding])
+    try:
+        # The decompressor has no eof attribute on Python 2. The extra byte
+        # is only left in unused_data if the end of the stream is reached.
+        decompressed = decompressor.decompress(
+            content + b'\0', max_bytes + 1 if max_bytes else 0)
+    except zlib.error as error:
+        raise ValueError('Invalid {0} content: {1}'.format(encoding, error))
+    if max_bytes and len(decompressed) > max_bytes:
+        raise ContentTooLarge('Decompressed content is larger than {0} '
+                              'bytes.'.format(max_bytes))
+    if not decompressor.unused_data:
+        raise ValueError('Truncated {0} content.'.format(encoding))
+    return decompressed
+
+
+class CompressionPlugin(object):
+    """
+    Bottle plugin (http://bottlepy.org/docs/dev/plugindev.html) decompressing
+    request bodies sent with a gzip or deflate Content-Encoding and, if
+    |threshold| is not None, compressing the responses of at least |threshold|
+    bytes with the encoding negotiated through the Accept-Encoding header.
+    Streamed responses are not compressed. Install it after HmacPlugin so that
+    HMACs are computed over the bytes sent on the wire.
+    """
+    name = 'compression'
+    api = 2
+
+    def __init__(self, threshold=None):
+        self._threshold = threshold
+
+    def __call__(self, callback):
+        def wrapper(*args, **kwargs):
+            self._decompress_request()
+            body = callback(*args, **kwargs)
+            if self._should_compress(body):
+                encoding = accepted_encoding(
+                    request.headers.get('Accept-Encoding'))
+                response.add_header('Vary', 'Accept-Encoding')
+                if encoding:
+                    response.set_header('Content-Encoding', encoding)
+                    return compress(body, encoding)
+            return body
+        return wrapper
+
+    def _decompress_request(self):
+        encoding = request.headers.get('Content-Encoding', '').strip().lower()
+        if encoding in ('', 'identity'):
+            return
+        if encoding not in _WBITS:
+            abort(httplib.UNSUPPORTED_MEDIA_TYPE,
+                  'Unsupported Content-Encoding {0}.'.format(encoding))
+        try:
+            request.environ[REQUEST_BODY_KEY] = decompress(
+                request_body(request), encoding, request.MEMFILE_MAX)
+        except ContentTooLarge as error:
+            abort(httplib.REQUEST_ENTITY_TOO_LARGE, str(error))
+        except ValueError as error:
+            abort(httplib.BAD_REQUEST, str(error))
+
+    def _should_compress(self, body):
+        return (self._threshold is not None and
+                isinstance(body, bytes) and
+                len(body) >= self._threshold)
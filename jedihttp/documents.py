@@ -0,0 +1,99 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from threading import Lock
+
+
+def offset_of(text, line, col):
+    """Return the offset in |text| of the position at |line| (starting with 1)
+    and |col| (starting with 0)."""
+    if line < 1:
+        raise ValueError('`line` parameter is not in a valid range.')
+    offset = 0
+    for _ in range(line - 1):
+        offset = text.find('\n', offset) + 1
+        if not offset:
+            raise ValueError('`line` parameter is not in a valid range.')
+    line_end = text.find('\n', offset)
+    if line_end == -1:
+        line_end = len(text)
+    if not 0 <= col <= line_end - offset:
+        raise ValueError('`col` parameter is not in a valid range.')
+    return offset + col
+
+
+def apply_edit(text, edit):
+    """Return |text| with |edit| applied. An edit replaces the range between
+    its |start| and |end| positions by its |text|. An edit without range
+    replaces the whole text."""
+    if 'start' not in edit:
+        return edit['text']
+    start = offset_of(text, edit['start']['line'], edit['start']['col'])
+    end = offset_of(text, edit['end']['line'], edit['end']['col'])
+    if end < start:
+        raise ValueError('Edit ends before it starts.')
+    return text[:start] + edit['text'] + text[end:]
+
+
+class Document(object):
+    def __init__(self, text, version=None):
+        self.text = text
+        self.version = version
+
+
+class DocumentStore(object):
+    """Thread-safe store of the buffers opened by the client. After opening a
+    document with its full text, the client only sends the edits made to it."""
+
+    def __init__(self):
+        self._documents = {}
+        self._lock = Lock()
+
+    def _get(self, path):
+        try:
+            return self._documents[path]
+        except KeyError:
+            raise ValueError('Document {0} is not open.'.format(path))
+
+    def open(self, path, text, version=None):
+        with self._lock:
+            self._documents[path] = Document(text, version)
+
+    def change(self, path, edits, version=None):
+        """Apply |edits|, in order, to the document at |path|. Each edit is
+        relative to the text resulting from the previous ones."""
+        with self._lock:
+            document = self._get(path)
+            if (version is not None and document.version is not None and
+                    version <= document.version):
+                raise ValueError('Version {0} of document {1} is not newer '
+                                 'than version {2}.'.format(version,
+                                                            path,
+                                                            document.version))
+            text = document.text
+            for edit in edits:
+                text = apply_edit(text, edit)
+            document.text = text
+            document.version = version
+
+    def close(self, path):
+        with self._lock:
+            self._documents.pop(path, None)
+
+    def get_text(self, path):
+        with self._lock:
+            return self._get(path).text
+
+    def __contains__(self, path):
+        with self._lock:
+            return path in self._documents
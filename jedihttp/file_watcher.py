@@ -0,0 +1,288 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from threading import Lock, Thread
+from jedihttp.utils import is_skipped_directory, python_files
+
+# Constants of <sys/inotify.h>.
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = (_IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO |
+               _IN_CREATE | _IN_DELETE)
+_EVENT_HEADER = struct.Struct('iIII')
+
+_fsencode = getattr(os, 'fsencode', lambda path: path)
+_fsdecode = getattr(os, 'fsdecode', lambda path: path)
+
+
+class Inotify(object):
+    """Minimal binding of the Linux inotify API with ctypes. Raise OSError if
+    inotify is not available."""
+
+    def __init__(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError('inotify is only available on Linux.')
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                           use_errno=True)
+        try:
+            inotify_init1 = libc.inotify_init1
+            self._inotify_add_watch = libc.inotify_add_watch
+        except AttributeError:
+            raise OSError('inotify is not available.')
+        self._inotify_add_watch.argtypes = [ctypes.c_int,
+                                            ctypes.c_char_p,
+                                            ctypes.c_uint32]
+        self.fd = inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        # Watched directory of each watch descriptor.
+        self._directories = {}
+
+    def __len__(self):
+        return len(self._directories)
+
+    def add_watch(self, directory):
+        descriptor = self._inotify_add_watch(self.fd,
+                                             _fsencode(directory),
+                                             _WATCH_MASK)
+        if descriptor < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), directory)
+        self._directories[descriptor] = directory
+
+    def read_events(self):
+        """Return the pending events as (directory, mask, name) tuples. The
+        directory is None for events not related to a watch, like a queue
+        overflow."""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as error:
+            if error.errno == errno.EAGAIN:
+                return []
+            raise
+        events = []
+        offset = 0
+        while offset < len(data):
+            descriptor, mask, _, length = _EVENT_HEADER.unpack_from(data,
+                                                                    offset)
+            offset += _EVENT_HEADER.size
+            name = _fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            directory = self._directories.get(descriptor)
+            if mask & _IN_IGNORED:
+                # The directory was removed.
+                self._directories.pop(descriptor, None)
+                continue
+            events.append((directory, mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileWatcher(object):
+    """Watch the Python files under |root|, skipping the same directories as
+    the symbol index, and call the subscribed callbacks with the set of paths
+    of the files created, modified or removed. Changes are delivered in a
+    background thread once no other change happened for |debounce| seconds.
+
+    Directories are watched with inotify on Linux if there are at most
+    |max_watches| of them. Otherwise, or if inotify is not available or
+    |use_inotify| is False, the modification times of the files are polled
+    every |poll_interval| seconds."""
+
+    def __init__(self, root, debounce=0.2, poll_interval=2.0,
+                 max_watches=4096, use_inotify=True):
+        self._logger = logging.getLogger(__name__)
+        self._root = os.path.abspath(root)
+        self._debounce = debounce
+        self._poll_interval = poll_interval
+        self._max_watches = max_watches
+        self._use_inotify = use_inotify
+        self._subscribers = []
+        self._lock = Lock()
+        self._stopped = False
+        self._inotify = None
+        # Known Python files and, when polling, their modification times.
+        self._mtimes = {}
+        self._pending = set()
+        self._last_change = None
+        self.backend = None
+
+    def subscribe(self, callback):
+        """Call |callback| with the set of the changed paths on changes."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def start(self):
+        self._mtimes = self._scan()
+        if self._use_inotify:
+            try:
+                self._inotify = Inotify()
+                self._watch_tree(self._root)
+            except OSError as error:
+                self._fall_back(error)
+        self.backend = 'inotify' if self._inotify is not None else 'polling'
+        self._logger.info('Watching %s with %s.', self._root, self.backend)
+        thread = Thread(target=self._main)
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        """Stop watching. Pending changes are dropped."""
+        self._stopped = True
+
+    def _scan(self):
+        mtimes = {}
+        for path in python_files(self._root):
+            try:
+                mtimes[path] = os.path.getmtime(path)
+            except OSError:
+                pass
+        return mtimes
+
+    def _watch_tree(self, root):
+        """Watch |root| and its subdirectories. Raise OSError if there are too
+        many directories to watch."""
+        for directory, subdirectories, _ in os.walk(root):
+            subdirectories[:] = [subdirectory
+                                 for subdirectory in subdirectories
+                                 if not is_skipped_directory(subdirectory)]
+            if len(self._inotify) >= self._max_watches:
+                raise OSError('More than {0} directories to watch.'.format(
+                    self._max_watches))
+            self._inotify.add_watch(directory)
+
+    def _fall_back(self, reason):
+        self._logger.info('Polling %s for changes: %s', self._root, reason)
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        self.backend = 'polling'
+
+    def _main(self):
+        next_poll = time.time() + self._poll_interval
+        while not self._stopped:
+            try:
+                if self._inotify is not None:
+                    self._wait_inotify()
+                else:
+                    time.sleep(max(0, next_poll - time.time()))
+                    next_poll = time.time() + self._poll_interval
+                    self._poll()
+                self._deliver()
+            except Exception:
+                self._logger.exception('Failed to watch %s.', self._root)
+                time.sleep(self._poll_interval)
+        if self._inotify is not None:
+            self._inotify.close()
+
+    def _changed(self, paths):
+        if paths:
+            self._pending.update(paths)
+            self._last_change = time.time()
+
+    def _wait_inotify(self):
+        timeout = self._debounce if self._pending else 1.0
+        readable, _, _ = select.select([self._inotify.fd], [], [], timeout)
+        if not readable:
+            return
+        for directory, mask, name in self._inotify.read_events():
+            if mask & _IN_Q_OVERFLOW:
+                # Events were lost, every file may have changed.
+                self._fall_back('inotify queue overflowed.')
+                mtimes = self._scan()
+                self._changed(set(self._mtimes) | set(mtimes))
+                self._mtimes = mtimes
+                return
+            if directory is None:
+                continue
+            path = os.path.join(directory, name)
+            if mask & _IN_ISDIR:
+                self._directory_changed(path, mask, name)
+            elif name.endswith('.py'):
+                self._file_changed(path, mask)
+
+    def _file_changed(self, path, mask):
+        if mask & (_IN_DELETE | _IN_MOVED_FROM):
+            self._mtimes.pop(path, None)
+        else:
+            self._mtimes[path] = None
+        self._changed([path])
+
+    def _directory_changed(self, path, mask, name):
+        if is_skipped_directory(name):
+            return
+        if mask & (_IN_CREATE | _IN_MOVED_TO):
+            # Files may have been created before the directory is watched.
+            created = list(python_files(path))
+            for created_path in created:
+                self._mtimes[created_path] = None
+            self._changed(created)
+            try:
+                self._watch_tree(path)
+            except OSError as error:
+                self._fall_back(error)
+                self._mtimes = self._scan()
+        elif mask & _IN_MOVED_FROM:
+            # The files of a directory moved out of the project are not
+            # reported one by one and can no longer be listed.
+            prefix = path + os.sep
+            moved = [known for known in self._mtimes
+                     if known.startswith(prefix)]
+            for moved_path in moved:
+                del self._mtimes[moved_path]
+            self._changed(moved)
+
+    def _poll(self):
+        mtimes = self._scan()
+        changed = set(path for path in self._mtimes
+                      if mtimes.get(path) != self._mtimes[path])
+        changed.update(path for path in mtimes if path not in self._mtimes)
+        self._mtimes = mtimes
+        self._changed(changed)
+
+    def _deliver(self):
+        if not self._pending:
+            return
+        if (self._inotify is not None and
+                time.time() - self._last_change < self._debounce):
+            return
+        paths, self._pending = self._pending, set()
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber(paths)
+            except Exception:
+                self._logger.exception('Failed to notify changes of %s.',
+                                       sorted(paths))
@@ -0,0 +1,73 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import itertools
+
+
+def fuzzy_score(query, word):
+    """Return how well |word| matches |query| when the characters of |query|
+    appear in order in |word|, or None if they don't. The score is the number
+    of characters skipped in |word| before its last matching character, so the
+    lower the better."""
+    position = -1
+    score = 0
+    for char in query:
+        found = word.find(char, position + 1)
+        if found == -1:
+            return None
+        score += found - position - 1
+        position = found
+    return score
+
+
+def _prefix_matches(items, prefix, key, case_sensitive):
+    """Return the items whose key starts with |prefix|. Unless the match is
+    |case_sensitive|, items matching with the same case come first."""
+    if case_sensitive:
+        return [item for item in items if key(item).startswith(prefix)]
+    lower_prefix = prefix.lower()
+    matches = [item for item in items
+               if key(item).lower().startswith(lower_prefix)]
+    return sorted(matches, key=lambda item: not key(item).startswith(prefix))
+
+
+def _fuzzy_matches(items, query, key, case_sensitive):
+    """Return the items whose key fuzzy matches |query|, best matches first:
+    prefix matches, then the ones with fewer skipped characters, then the
+    shortest ones."""
+    if not case_sensitive:
+        query = query.lower()
+    scored = []
+    for index, item in enumerate(items):
+        word = key(item) if case_sensitive else key(item).lower()
+        score = fuzzy_score(query, word)
+        if score is not None:
+            scored.append(((not word.startswith(query), score, len(word),
+                            index), item))
+    scored.sort(key=lambda entry: entry[0])
+    return [item for _, item in scored]
+
+
+def filter_items(items, query='', key=lambda item: item.name, fuzzy=False,
+                 case_sensitive=True, max_results=None):
+    """Filter |items| whose |key| matches |query| and return at most
+    |max_results| of them. Without |fuzzy|, the key must start with |query|
+    and the order of |items| is kept otherwise."""
+    if query:
+        if fuzzy:
+            items = _fuzzy_matches(items, query, key, case_sensitive)
+        else:
+            items = _prefix_matches(items, query, key, case_sensitive)
+    if max_results is not None:
+        items = list(itertools.islice(items, max_results))
+    return items
@@ -0,0 +1,33 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from threading import Lock
+
+
+class GenerationTracker(object):
+    """Thread-safe record of the latest request generation received for each
+    file. A request is superseded once a request with a greater generation has
+    been received for the same file."""
+
+    def __init__(self):
+        self._latest = {}
+        self._lock = Lock()
+
+    def register(self, path, generation):
+        with self._lock:
+            if generation > self._latest.get(path, generation - 1):
+                self._latest[path] = generation
+
+    def is_superseded(self, path, generation):
+        with self._lock:
+            return generation < self._latest.get(path, generation)
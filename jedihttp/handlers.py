@@ -15,16 +15,30 @@
 from jedihttp import utils
 utils.add_vendor_folder_to_sys_path()
 
-import contextlib
+import hashlib
+import itertools
 import jedi
 import logging
 import json
+import os
+import uuid
 import bottle
-from bottle import response, request, Bottle
-from jedihttp import hmaclib
-from jedihttp.compatibility import iteritems
-from jedihttp.settings import default_settings
-from threading import Lock, Thread
+from bottle import response, request, abort, Bottle
+from jedihttp import codec
+from jedihttp.cache import LruCache
+from jedihttp.compatibility import encode_string
+from jedihttp.completion_cache import CompletionCache
+from jedihttp.documents import DocumentStore
+from jedihttp.filtering import filter_items
+from jedihttp.generations import GenerationTracker
+from jedihttp.preload import ActivityTracker, PreloadQueue
+from jedihttp.profiler_plugin import WORKER_PROFILE_KEY
+from jedihttp.settings import AppliedSettings, SettingsProfiles
+from jedihttp.symbol_index import identifier_at
+from jedihttp.warmup import ModuleRecorder, write_modules
+from jedihttp.timing import TimedLock
+from jedihttp.utils import request_body
+from threading import Thread
 
 try:
     import httplib
@@ -32,108 +46,270 @@ except ImportError:
     from http import client as httplib
 
 
-# num bytes for the request body buffer; request.json only works if the request
-# size is less than this
+# num bytes for the request body buffer; requests with a larger body are
+# rejected with the REQUEST_ENTITY_TOO_LARGE status code
 bottle.Request.MEMFILE_MAX = 1000 * 1024
 
 logger = logging.getLogger(__name__)
 app = Bottle(__name__)
 wsgi_server = None
 
-# Jedi is not thread safe.
-jedi_lock = Lock()
+# Jedi is not thread safe. The time spent waiting for and holding the lock is
+# recorded for the metrics.
+jedi_lock = TimedLock()
+
+# When set to a WorkerPool, Jedi operations are run by worker processes, each
+# with its own Jedi state, instead of in this process under jedi_lock.
+jedi_pool = None
+
+# Parsed scripts of the last requests. A jedi.Script is bound to a position in
+# the buffer so scripts are keyed by path, position and a digest of the source.
+# The byte budget is on the size of the sources, not on the memory used by the
+# scripts, which also hold their parse trees and inference state.
+script_cache = LruCache(max_entries=8, max_bytes=16 * 1024 * 1024)
+
+# Completions of the word being typed, narrowed down as the user types.
+completion_cache = CompletionCache(max_entries=8)
+
+# Completions returned without their docstrings, kept so that the docstring of
+# one of them can be resolved later. Keyed by a token that is part of the
+# handles sent to the client. Handles also contain a nonce of the process, see
+# _handle_nonce, since each worker has its own tokens.
+completion_handles = LruCache(max_entries=16)
+_completion_tokens = itertools.count()
+_nonce = None
+
+# Interactive requests being served. Preloading waits for them, up to
+# PRELOAD_IDLE_TIMEOUT seconds per module, so that it doesn't slow them down.
+interactive_requests = ActivityTracker()
+PRELOAD_IDLE_TIMEOUT = 1.0
+
+# Modules preloaded in the background, one at a time, by /preload_module jobs.
+preload_queue = PreloadQueue(
+    lambda modules, settings: preload_modules(modules, settings),
+    lambda: interactive_requests.wait_idle(PRELOAD_IDLE_TIMEOUT))
+
+# Modules resolved by Jedi in this process. When warmup_file is set, they are
+# recorded in that file on shutdown so that the next server preloads them while
+# warmup_job, the id of the preload job of the previous session, is running.
+resolved_modules = ModuleRecorder()
+warmup_file = None
+warmup_job = None
+
+# Buffers opened by the client through /open_document. Requests without a
+# source use the buffer of their path.
+documents = DocumentStore()
+
+# Latest request generation received for each file. Requests with an older
+# generation are dropped with the SUPERSEDED status code instead of being run.
+generations = GenerationTracker()
+SUPERSEDED = httplib.CONFLICT
+
+# Settings profiles registered by the client. They are resolved by the server
+# process so workers only see the resulting settings and apply them when they
+# differ from the ones they already use.
+settings_profiles = SettingsProfiles()
+applied_settings = AppliedSettings()
+
+# Index of the symbols of the project given with --project-root, if any.
+symbol_index = None
 
 
 @app.post('/healthy')
 def healthy():
     logger.debug('received /healthy request')
-    return _json_response(True)
+    return _encoded_response(True)
 
 
 @app.post('/ready')
 def ready():
     logger.debug('received /ready request')
-    return _json_response(True)
+    return _encoded_response(warmup_job is None or
+                             preload_queue.is_finished(warmup_job))
 
 
 @app.post('/completions')
 def completions():
     logger.debug('received /completions request')
-    with jedi_lock:
-        request_json = request.json
-        with _custom_settings(request_json):
-            script = _get_jedi_script(request_json)
-            response = _format_completions(script.completions())
-    return _json_response(response)
+    request_data = _request_data()
+    if request_data.get('stream', False):
+        return _ndjson_response(_dispatch_stream('completions', request_data))
+    return _encoded_response(_dispatch('completions', request_data))
 
 
 @app.post('/gotodefinition')
 def gotodefinition():
     logger.debug('received /gotodefinition request')
-    with jedi_lock:
-        request_json = request.json
-        with _custom_settings(request_json):
-            script = _get_jedi_script(request_json)
-            response = _format_definitions(script.goto_definitions())
-    return _json_response(response)
+    return _encoded_response(_dispatch('gotodefinition', _request_data()))
 
 
 @app.post('/gotoassignment')
 def gotoassignments():
     logger.debug('received /gotoassignment request')
-    with jedi_lock:
-        request_json = request.json
-        follow_imports = request_json.get('follow_imports', False)
-        with _custom_settings(request_json):
-            script = _get_jedi_script(request_json)
-            response = _format_definitions(
-                script.goto_assignments(follow_imports))
-    return _json_response(response)
+    return _encoded_response(_dispatch('gotoassignment', _request_data()))
 
 
 @app.post('/usages')
 def usages():
     logger.debug('received /usages request')
-    with jedi_lock:
-        request_json = request.json
-        with _custom_settings(request_json):
-            script = _get_jedi_script(request_json)
-            response = _format_definitions(script.usages())
-    return _json_response(response)
+    request_data = _request_data()
+    _add_usages_occurrences(request_data)
+    return _encoded_response(_dispatch('usages', request_data))
 
 
 @app.post('/names')
 def names():
     logger.debug('received /names request')
-    with jedi_lock:
-        request_json = request.json
-        with _custom_settings(request_json):
-            definitions = _get_jedi_names(request_json)
-            response = _format_definitions(definitions)
-    return _json_response(response)
+    return _encoded_response(_dispatch('names', _request_data()))
+
+
+@app.post('/resolve')
+def resolve():
+    logger.debug('received /resolve request')
+    return _encoded_response(_dispatch('resolve',
+                                       _request_data(),
+                                       with_source=False))
+
+
+@app.post('/batch')
+def batch():
+    logger.debug('received /batch request')
+    request_data = _request_data()
+    if any(operation.get('operation') == 'usages'
+           for operation in request_data.get('operations', [])):
+        _add_usages_occurrences(request_data)
+    return _encoded_response(_dispatch('batch', request_data))
 
 
 @app.post('/preload_module')
 def preload_module():
     logger.debug('received /preload_module request')
-    with jedi_lock:
-        request_json = request.json
-        with _custom_settings(request_json):
-            jedi.preload_module(*request_json['modules'])
-    return _json_response(True)
+    request_data = _request_data()
+    _resolve_settings(request_data)
+    job_id = preload_queue.submit(request_data['modules'],
+                                  request_data.get('settings'))
+    return _encoded_response({'job_id': job_id})
+
+
+@app.post('/preload_status')
+def preload_status():
+    logger.debug('received /preload_status request')
+    job_id = _request_data().get('job_id')
+    return _encoded_response(preload_queue.status(job_id))
+
+
+@app.post('/workspace_symbols')
+def workspace_symbols():
+    logger.debug('received /workspace_symbols request')
+    request_data = _request_data()
+    if symbol_index is None:
+        raise ValueError('No project is indexed, start JediHTTP with '
+                         '--project-root.')
+    return _encoded_response({
+        'symbols': symbol_index.search(request_data.get('query', ''),
+                                       request_data.get('fuzzy', False),
+                                       request_data.get('max_results', 100)),
+        'complete': symbol_index.is_complete()
+    })
+
+
+@app.post('/register_settings_profile')
+def register_settings_profile():
+    logger.debug('received /register_settings_profile request')
+    request_data = _request_data()
+    settings_profiles.register(request_data['name'],
+                               request_data['settings'])
+    return _encoded_response(True)
+
+
+@app.post('/open_document')
+def open_document():
+    logger.debug('received /open_document request')
+    request_data = _request_data()
+    documents.open(request_data['source_path'],
+                   request_data['source'],
+                   request_data.get('version'))
+    return _encoded_response(True)
+
+
+@app.post('/change_document')
+def change_document():
+    logger.debug('received /change_document request')
+    request_data = _request_data()
+    documents.change(request_data['source_path'],
+                     request_data['edits'],
+                     request_data.get('version'))
+    return _encoded_response(True)
+
+
+@app.post('/close_document')
+def close_document():
+    logger.debug('received /close_document request')
+    documents.close(_request_data()['source_path'])
+    return _encoded_response(True)
+
+
+@app.post('/debug/caches')
+def debug_caches():
+    logger.debug('received /debug/caches request')
+    return _encoded_response(_broadcast('cache_stats', {}))
+
+
+@app.post('/debug/import_graph')
+def debug_import_graph():
+    logger.debug('received /debug/import_graph request')
+    request_data = _request_data()
+    if symbol_index is None:
+        raise ValueError('No project is indexed, start JediHTTP with '
+                         '--project-root.')
+    return _encoded_response({
+        'modules': symbol_index.import_graph(request_data.get('paths')),
+        'complete': symbol_index.is_complete()
+    })
 
 
 @app.post('/shutdown')
 def shutdown():
     logger.info('received shutdown request')
     server_shutdown()
-    return _json_response(True)
+    return _encoded_response(True)
+
+
+def preload_modules(modules, settings=None):
+    _broadcast('preload_module', {'modules': modules, 'settings': settings})
+
+
+def _record_resolved_modules():
+    try:
+        write_modules(warmup_file, _broadcast('resolved_modules', {}))
+    except Exception:
+        logger.exception('Failed to record resolved modules in %s.',
+                         warmup_file)
+
+
+def invalidate_paths(paths):
+    """Update the symbol index and drop the cached results of every Jedi
+    process depending on the files of |paths|, which changed on disk, or on
+    the files importing them. This is called by the file watcher."""
+    if symbol_index is not None:
+        # Removed files are only in the import graph before the update and
+        # new imports only after it.
+        importers = symbol_index.importers(paths)
+        symbol_index.update_paths(paths)
+        paths = importers | symbol_index.importers(paths)
+    invalidated = _broadcast('invalidate_paths', {'paths': sorted(paths)})
+    logger.debug('Invalidated %s cached results for %s changed files.',
+                 sum(invalidated), len(paths))
 
 
 def server_shutdown():
     def terminate():
+        if warmup_file:
+            _record_resolved_modules()
         if wsgi_server:
             wsgi_server.shutdown()
+        if jedi_pool:
+            jedi_pool.shutdown()
 
     # Use a separate thread to let the server send the response before shutting
     # down.
@@ -142,20 +318,421 @@ def server_shutdown():
     terminator.start()
 
 
-def _format_completions(completions):
+def _affinity(request_data):
+    return request_data.get('source_path') or request_data.get('path')
+
+
+def _resolve_settings(request_data):
+    """Replace the settings profile of |request_data|, if any, by its
+    settings."""
+    name = request_data.pop('settings_profile', None)
+    if name is not None:
+        request_data['settings'] = settings_profiles.resolve(
+            name, request_data.get('settings'))
+
+
+def _add_usages_occurrences(request_data):
+    """Add to |request_data| the lines where the name under the cursor appears
+    in each indexed file, keyed by path, to look for its usages there.
+    Otherwise, Jedi looks in the directories of the modules defining the name
+    and parses all their files containing it, even inside another
+    identifier, so _usages turns this directory scan off. Until the index is
+    built, Jedi looks for usages as usual."""
+    if (symbol_index is None or
+            not symbol_index.is_complete() or
+            not symbol_index.contains(request_data['source_path'])):
+        return
+    source = request_data.get('source')
+    if source is None:
+        source = documents.get_text(request_data['source_path'])
+    name = identifier_at(source, request_data['line'], request_data['col'])
+    if name is not None:
+        request_data['occurrences'] = symbol_index.occurrences(name)
+
+
+def _prepare(request_data, with_source):
+    """Fill in the source of |request_data| from the opened documents,
+    resolve its settings profile and register its generation. Return the
+    affinity of the request and the check function dropping it once
+    superseded, if any."""
+    _resolve_settings(request_data)
+    path = _affinity(request_data)
+    if with_source and 'source' not in request_data:
+        request_data['source'] = documents.get_text(path)
+
+    generation = request_data.get('request_generation')
+    if generation is None:
+        return path, None
+    generations.register(path, generation)
+
+    def check():
+        if generations.is_superseded(path, generation):
+            abort(SUPERSEDED, 'Request generation {0} for {1} has been '
+                  'superseded.'.format(generation, path))
+    return path, check
+
+
+def _dispatch(operation, request_data, with_source=True):
+    path, check = _prepare(request_data, with_source)
+    with interactive_requests.active():
+        if jedi_pool:
+            result = jedi_pool.run(operation, request_data, path, check,
+                                   request.environ.get(WORKER_PROFILE_KEY))
+        else:
+            result = run_operation(operation, request_data, check)
+    # Results of a superseded request are dropped without being serialized.
+    if check:
+        check()
+    return result
+
+
+def _dispatch_stream(operation, request_data):
+    path, check = _prepare(request_data, with_source=True)
+    if jedi_pool:
+        results = jedi_pool.stream(operation, request_data, path, check,
+                                   request.environ.get(WORKER_PROFILE_KEY))
+    else:
+        results = stream_operation(operation, request_data, check)
+    return _interactive_stream(results)
+
+
+def _interactive_stream(results):
+    with interactive_requests.active():
+        for result in results:
+            yield result
+
+
+def _broadcast(operation, request_data):
+    if jedi_pool:
+        return jedi_pool.broadcast(operation, request_data)
+    return [run_operation(operation, request_data)]
+
+
+def run_operation(operation, request_data, check=None):
+    """Run the Jedi |operation| on |request_data| in this process. This is
+    what worker processes call for each request they receive. If given,
+    |check| is called once jedi_lock is acquired and may raise to cancel the
+    operation."""
+    with jedi_lock:
+        if check:
+            check()
+        applied_settings.apply(request_data.get('settings'))
+        return _OPERATIONS[operation](request_data)
+
+
+def stream_operation(operation, request_data, check=None):
+    """Same as run_operation for operations producing their results one at a
+    time. jedi_lock is held until the last result is yielded."""
+    with jedi_lock:
+        if check:
+            check()
+        applied_settings.apply(request_data.get('settings'))
+        for result in _STREAM_OPERATIONS[operation](request_data):
+            yield result
+
+
+def _completions(script, request_data):
+    return _format_completions(*_filter_completions(script.completions(),
+                                                    request_data))
+
+
+def _cached_completions(request_data):
+    return _format_completions(*_filter_completions(
+        _get_completions(request_data), request_data))
+
+
+def _stream_completions(request_data):
+    completions, token = _filter_completions(_get_completions(request_data),
+                                             request_data)
+    for index, completion in enumerate(completions):
+        yield _format_completion(completion, token, index)
+
+
+def _get_completions(request_data):
+    case_sensitive = not jedi.settings.case_insensitive_completion
+    completions = completion_cache.get(request_data, case_sensitive)
+    if completions is None:
+        script = _get_jedi_script(request_data)
+        completions = script.completions()
+        resolved_modules.record(script)
+        completion_cache.put(request_data, completions, _script_paths(script))
+    return completions
+
+
+def _filter_completions(completions, request_data):
+    """Filter |completions| as requested. Return them along with the token of
+    their handles if their docstrings are to be resolved later."""
+    # Filter before formatting since formatting scales with the number of
+    # completions.
+    completions = filter_items(
+        completions,
+        query=request_data.get('prefix', ''),
+        fuzzy=request_data.get('fuzzy', False),
+        case_sensitive=not jedi.settings.case_insensitive_completion,
+        max_results=request_data.get('max_results'))
+    if request_data.get('docstrings', True):
+        return completions, None
+    token = '{0}:{1}'.format(_handle_nonce(), next(_completion_tokens))
+    completion_handles.put(token, completions)
+    return completions, token
+
+
+def _handle_nonce():
+    """Return the nonce of the completion handles of this process, made of
+    its pid and a random part so that a handle resolved by another worker, or
+    by a worker started again with the same pid, is rejected. It is created in
+    the process itself since workers may be forked after this module is
+    imported."""
+    global _nonce
+    pid = os.getpid()
+    if _nonce is None or _nonce[0] != pid:
+        _nonce = (pid, '{0}-{1}'.format(pid, uuid.uuid4().hex[:8]))
+    return _nonce[1]
+
+
+def _gotodefinition(script, request_data):
+    return _format_definitions(script.goto_definitions())
+
+
+def _gotoassignment(script, request_data):
+    follow_imports = request_data.get('follow_imports', False)
+    return _format_definitions(script.goto_assignments(follow_imports))
+
+
+def _usages(script, request_data):
+    if request_data.get('occurrences') is None:
+        return _format_definitions(script.usages())
+    # The setting is not part of the request settings so that the script
+    # cached by a previous request at the same position is reused.
+    with applied_settings.overridden('dynamic_params_for_other_modules',
+                                     False):
+        usages = script.usages()
+        # Same order as Jedi.
+        usages = sorted(usages + _indexed_usages(script, request_data, usages),
+                        key=lambda definition: (definition.module_path or '',
+                                                definition.line or 0,
+                                                definition.column or 0))
+    return _format_definitions(usages)
+
+
+def _indexed_usages(script, request_data, usages):
+    """Return the usages of the name under the cursor of |script| on the lines
+    of request_data['occurrences'], in the files where Jedi found none of
+    |usages|. Only these files are parsed."""
+    assignments = _assignments(script.goto_assignments())
+    if not assignments:
+        return []
+    name = identifier_at(request_data['source'],
+                         request_data['line'],
+                         request_data['col'])
+    searched = set(usage.module_path for usage in usages)
+    searched.add(request_data['source_path'])
+    found = []
+    for path, lines in sorted(request_data['occurrences'].items()):
+        if path not in searched:
+            found.extend(_file_usages(path, set(lines), name, assignments))
+    return found
+
+
+def _file_usages(path, lines, name, assignments):
+    """Return the names |name| of the file |path| on |lines| resolving to one
+    of |assignments|."""
+    try:
+        with open(path, 'rb') as source_file:
+            source = source_file.read()
+    except (IOError, OSError):
+        return []
+    return [definition for definition in jedi.names(source,
+                                                    path,
+                                                    all_scopes=True,
+                                                    definitions=True,
+                                                    references=True)
+            if definition.name == name and definition.line in lines and
+            not assignments.isdisjoint(_assignments([definition]))]
+
+
+def _assignments(definitions):
+    """Return the positions of the assignments |definitions| resolve to,
+    through imports, as (module_path, line, column) tuples."""
+    assignments = set()
+    visited = set()
+    pending = list(definitions)
+    while pending:
+        definition = pending.pop()
+        position = (definition.module_path, definition.line,
+                    definition.column)
+        if position in visited:
+            continue
+        visited.add(position)
+        # Jedi returns the definition itself when it has no tree name, like
+        # for builtins.
+        targets = definition.goto_assignments()
+        if not isinstance(targets, list):
+            targets = [targets]
+        targets = [target for target in targets
+                   if (target.module_path, target.line,
+                       target.column) != position]
+        if targets:
+            pending.extend(targets)
+        else:
+            assignments.add(position)
+    return assignments
+
+
+_SCRIPT_OPERATIONS = {
+    'completions':    _completions,
+    'gotodefinition': _gotodefinition,
+    'gotoassignment': _gotoassignment,
+    'usages':         _usages,
+}
+
+
+def _script_operation(function):
+    def operation(request_data):
+        script = _get_jedi_script(request_data)
+        result = function(script, request_data)
+        resolved_modules.record(script)
+        return result
+    return operation
+
+
+def _batch(request_data):
+    operations = request_data['operations']
+    for operation in operations:
+        if operation['operation'] not in _SCRIPT_OPERATIONS:
+            raise ValueError('Unknown batch operation {0}.'.format(
+                operation['operation']))
+    script = _get_jedi_script(request_data)
+    results = [
+        _SCRIPT_OPERATIONS[operation['operation']](
+            script, _batch_operation_data(request_data, operation))
+        for operation in operations]
+    resolved_modules.record(script)
     return {
-        'completions': [{
-            'module_path': completion.module_path,
-            'name':        completion.name,
-            'type':        completion.type,
-            'line':        completion.line,
-            'column':      completion.column,
-            'docstring':   completion.docstring(),
-            'description': completion.description,
-        } for completion in completions]
+        'results': results
     }
 
 
+def _batch_operation_data(request_data, operation):
+    """Return the data of the batch |operation|. Usages get the source,
+    position and occurrences of the batch request, like for /usages."""
+    if (operation['operation'] != 'usages' or
+            'occurrences' not in request_data):
+        return operation
+    operation_data = dict(operation)
+    for key in ('source', 'source_path', 'line', 'col', 'occurrences'):
+        operation_data[key] = request_data[key]
+    return operation_data
+
+
+def _names(request_data):
+    return _format_definitions(_get_jedi_names(request_data))
+
+
+def _preload_module(request_data):
+    jedi.preload_module(*request_data['modules'])
+    return True
+
+
+def _resolved_modules(request_data):
+    return resolved_modules.counts()
+
+
+def _resolve(request_data):
+    handle = request_data['handle']
+    try:
+        nonce, token, index = handle.split(':')
+        index = int(index)
+    except ValueError:
+        raise ValueError('Invalid completion handle {0}.'.format(handle))
+    if nonce != _handle_nonce():
+        raise ValueError('Completion handle {0} was not issued by this '
+                         'process.'.format(handle))
+    completions = completion_handles.get('{0}:{1}'.format(nonce, token))
+    if completions is None:
+        raise ValueError('Completion handle {0} has expired.'.format(handle))
+    return {
+        'docstring': completions[index].docstring()
+    }
+
+
+def _script_paths(script):
+    """Return the paths of the modules loaded by |script|."""
+    # Like in ModuleRecorder, this is not part of the Jedi API so nothing is
+    # returned if it changes.
+    evaluator = getattr(script, '_evaluator', None)
+    paths = set()
+    for module in getattr(evaluator, 'modules', {}).values():
+        try:
+            paths.add(module.py__file__())
+        except AttributeError:
+            pass
+    return paths
+
+
+def _invalidate_paths(request_data):
+    paths = set(request_data['paths'])
+
+    def depends_on_paths(key, script):
+        # The first item of the key is the path of the script.
+        return key[0] in paths or not paths.isdisjoint(_script_paths(script))
+
+    return (script_cache.invalidate(depends_on_paths) +
+            completion_cache.invalidate(paths))
+
+
+def _cache_stats(request_data):
+    return {
+        'script_cache':       script_cache.stats(),
+        'completion_cache':   completion_cache.stats(),
+        'completion_handles': completion_handles.stats()
+    }
+
+
+_OPERATIONS = {
+    'completions':      _cached_completions,
+    'gotodefinition':   _script_operation(_gotodefinition),
+    'gotoassignment':   _script_operation(_gotoassignment),
+    'usages':           _script_operation(_usages),
+    'batch':            _batch,
+    'names':            _names,
+    'preload_module':   _preload_module,
+    'resolve':          _resolve,
+    'resolved_modules': _resolved_modules,
+    'cache_stats':      _cache_stats,
+    'invalidate_paths': _invalidate_paths,
+}
+
+_STREAM_OPERATIONS = {
+    'completions': _stream_completions,
+}
+
+
+def _format_completions(completions, token=None):
+    """Format |completions| with their docstrings or, if a |token| is given,
+    with a handle to resolve their docstring later."""
+    return {
+        'completions': [_format_completion(completion, token, index)
+                        for index, completion in enumerate(completions)]
+    }
+
+
+def _format_completion(completion, token, index):
+    formatted = {
+        'module_path': completion.module_path,
+        'name':        completion.name,
+        'type':        completion.type,
+        'line':        completion.line,
+        'column':      completion.column,
+        'description': completion.description,
+    }
+    if token is None:
+        formatted['docstring'] = completion.docstring()
+    else:
+        formatted['handle'] = '{0}:{1}'.format(token, index)
+    return formatted
+
+
 def _format_definitions(definitions):
     return {
         'definitions': [{
@@ -174,10 +751,22 @@ def _format_definitions(definitions):
 
 
 def _get_jedi_script(request_data):
-    return jedi.Script(request_data['source'],
-                       request_data['line'],
-                       request_data['col'],
-                       request_data['source_path'])
+    source = request_data['source']
+    # Jedi settings are part of the key since the inference state kept by a
+    # script depends on them.
+    key = (request_data['source_path'],
+           request_data['line'],
+           request_data['col'],
+           hashlib.sha1(encode_string(source)).hexdigest(),
+           json.dumps(request_data.get('settings'), sort_keys=True))
+    script = script_cache.get(key)
+    if script is None:
+        script = jedi.Script(source,
+                             request_data['line'],
+                             request_data['col'],
+                             request_data['source_path'])
+        script_cache.put(key, script, len(source))
+    return script
 
 
 def _get_jedi_names(request_data):
@@ -188,47 +777,61 @@ def _get_jedi_names(request_data):
                       references=request_data.get('references', False))
 
 
-def _set_jedi_settings(settings):
-    for name, value in iteritems(settings):
-        setattr(jedi.settings, name, value)
-
-
-@contextlib.contextmanager
-def _custom_settings(request_data):
-    settings = request_data.get('settings')
-    if not settings:
-        yield
-        return
-    try:
-        _set_jedi_settings(settings)
-        yield
-    finally:
-        _set_jedi_settings(default_settings)
-
-
 @app.error(httplib.INTERNAL_SERVER_ERROR)
 def error_handler(httperror):
-    body = _json_response({
-        'exception': httperror.exception,
+    return _error_response({
+        'exception': _format_exception(httperror.exception),
         'message': str(httperror.exception),
         'traceback': httperror.traceback
     })
-    if 'jedihttp.hmac_secret' in app.config:
-        hmac_secret = app.config['jedihttp.hmac_secret']
-        hmachelper = hmaclib.JediHTTPHmacHelper(hmac_secret)
+
+
+@app.error(SUPERSEDED)
+@app.error(httplib.REQUEST_ENTITY_TOO_LARGE)
+def message_error_handler(httperror):
+    return _error_response({
+        'message': httperror.body
+    })
+
+
+def _error_response(data):
+    body = _encoded_response(data)
+    # Set by HmacPlugin.
+    hmachelper = app.config.get('jedihttp.hmac_helper')
+    if hmachelper:
         hmachelper.sign_response_headers(response.headers, body)
     return body
 
 
-def _json_response(data):
-    response.content_type = 'application/json'
-    return json.dumps(data, default=_serializer)
+def _format_exception(exception):
+    if exception is None:
+        return None
+    return {'TYPE': type(exception).__name__}
 
 
-def _serializer(obj):
-    try:
-        serialized = obj.__dict__.copy()
-        serialized['TYPE'] = type(obj).__name__
-        return serialized
-    except AttributeError:
-        return str(obj)
+def _request_data():
+    """Decode the body of the request, in MessagePack if its Content-Type
+    says so and JSON otherwise."""
+    # The body of a compressed request is decompressed by CompressionPlugin.
+    body = request_body(request)
+    if not codec.is_msgpack(request.content_type):
+        return codec.loads(body)
+    if codec.msgpack is None:
+        abort(httplib.UNSUPPORTED_MEDIA_TYPE,
+              'MessagePack is not supported, install msgpack.')
+    return codec.msgpack_loads(body)
+
+
+def _encoded_response(data):
+    """Encode |data| in MessagePack if the client accepts it and JSON
+    otherwise."""
+    if codec.accepts_msgpack(request.headers.get('Accept')):
+        response.content_type = codec.MSGPACK_MIME_TYPE
+        return codec.msgpack_dumps(data)
+    response.content_type = codec.JSON_MIME_TYPE
+    return codec.dumps(data)
+
+
+def _ndjson_response(items):
+    response.content_type = 'application/x-ndjson'
+    return (codec.dumps(item) + b'\n' for item in items)
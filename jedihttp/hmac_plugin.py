@@ -13,8 +13,10 @@
 
 
 import logging
+import types
 from bottle import request, response, abort
 from jedihttp import hmaclib
+from jedihttp.utils import request_body
 
 try:
     from urlparse import urlparse
@@ -28,20 +30,25 @@ class HmacPlugin(object):
     """
     Bottle plugin for hmac request authentication
     http://bottlepy.org/docs/dev/plugindev.html
+    Unless |check_host| is False, e.g. when the server listens on a Unix
+    socket, requests must also come with a local Host header.
     """
     name = 'hmac'
     api = 2
 
-    def __init__(self):
+    def __init__(self, check_host=True):
         self._logger = logging.getLogger(__name__)
+        self._check_host = check_host
 
     def setup(self, app):
         hmac_secret = app.config['jedihttp.hmac_secret']
         self._hmachelper = hmaclib.JediHTTPHmacHelper(hmac_secret)
+        # Used to sign the responses of the error handlers.
+        app.config['jedihttp.hmac_helper'] = self._hmachelper
 
     def __call__(self, callback):
         def wrapper(*args, **kwargs):
-            if not is_local_request():
+            if self._check_host and not is_local_request():
                 self._logger.info('Dropping request with bad Host header.')
                 abort(httplib.UNAUTHORIZED,
                       'Unauthorized, received request from non-local Host.')
@@ -53,6 +60,8 @@ class HmacPlugin(object):
                 return
 
             body = callback(*args, **kwargs)
+            if isinstance(body, types.GeneratorType):
+                return self._hmachelper.sign_response_stream(body)
             self.sign_response_headers(response.headers, body)
             return body
         return wrapper
@@ -61,7 +70,7 @@ class HmacPlugin(object):
         return self._hmachelper.is_request_authenticated(request.headers,
                                                          request.method,
                                                          request.path,
-                                                         request.body.read())
+                                                         request_body(request))
 
     def sign_response_headers(self, headers, body):
         self._hmachelper.sign_response_headers(headers, body)
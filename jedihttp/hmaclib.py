@@ -39,6 +39,7 @@ def temporary_hmac_secret_file(secret):
 
 
 _HMAC_HEADER = 'x-jedihttp-hmac'
+_HMAC_TRAILER_KEY = 'hmac'
 
 
 class JediHTTPHmacHelper(object):
@@ -46,6 +47,9 @@ class JediHTTPHmacHelper(object):
     communicating with a JediHTTP server."""
     def __init__(self, secret):
         self._secret = encode_string(secret)
+        # HMAC state after hashing the key, copied for each HMAC instead of
+        # hashing the key again.
+        self._keyed_hmac = hmac.new(self._secret, digestmod=hashlib.sha256)
 
     def _has_header(self, headers):
         return _HMAC_HEADER in headers
@@ -56,17 +60,22 @@ class JediHTTPHmacHelper(object):
     def _get_hmac_header(self, headers):
         return b64decode(headers[_HMAC_HEADER])
 
+    def _new_hmac(self):
+        return self._keyed_hmac.copy()
+
     def _hmac(self, content):
-        return hmac.new(self._secret,
-                        msg=encode_string(content),
-                        digestmod=hashlib.sha256).digest()
+        if not isinstance(content, bytes):
+            content = encode_string(content)
+        content_hmac = self._new_hmac()
+        content_hmac.update(content)
+        return content_hmac.digest()
 
     def _compute_request_hmac(self, method, path, body):
-        if not body:
-            body = ''
-        return self._hmac(b''.join((self._hmac(method),
-                                    self._hmac(path),
-                                    self._hmac(body))))
+        request_hmac = self._new_hmac()
+        request_hmac.update(self._hmac(method))
+        request_hmac.update(self._hmac(path))
+        request_hmac.update(self._hmac(body or b''))
+        return request_hmac.digest()
 
     def sign_request_headers(self, headers, method, path, body):
         self._set_hmac_header(headers,
@@ -88,3 +97,30 @@ class JediHTTPHmacHelper(object):
 
         return compare_digest(self._get_hmac_header(headers),
                               self._hmac(content))
+
+    def sign_response_stream(self, chunks):
+        """Yield the |chunks| of a streamed newline-delimited JSON response
+        followed by a trailer line holding the HMAC of all the chunks, since
+        headers are sent before the HMAC of the body can be known."""
+        response_hmac = self._new_hmac()
+        for chunk in chunks:
+            chunk = encode_string(chunk)
+            response_hmac.update(chunk)
+            yield chunk
+        trailer = {_HMAC_TRAILER_KEY:
+                   decode_string(b64encode(response_hmac.digest()))}
+        yield encode_string(json.dumps(trailer) + '\n')
+
+    def is_response_stream_authenticated(self, content):
+        """Check the trailer line of a response signed with
+        sign_response_stream."""
+        content = encode_string(content)
+        trailer_start = content.rstrip(b'\n').rfind(b'\n') + 1
+        try:
+            trailer = json.loads(decode_string(content[trailer_start:]))
+            trailer_hmac = b64decode(trailer[_HMAC_TRAILER_KEY])
+        except (ValueError, TypeError, KeyError):
+            return False
+
+        return compare_digest(trailer_hmac,
+                              self._hmac(content[:trailer_start]))
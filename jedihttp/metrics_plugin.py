@@ -0,0 +1,195 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import bisect
+import time
+import types
+from bottle import request, response
+from threading import Lock
+from jedihttp import timing
+from jedihttp.compatibility import encode_string
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+BYTES_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+# Histograms tracked for each route with their help text and buckets.
+_HISTOGRAMS = (
+    ('jedihttp_request_duration_seconds', 'Time spent serving requests.',
+     SECONDS_BUCKETS),
+    ('jedihttp_lock_wait_seconds', 'Time requests spent waiting for Jedi.',
+     SECONDS_BUCKETS),
+    ('jedihttp_lock_hold_seconds', 'Time requests spent holding Jedi.',
+     SECONDS_BUCKETS),
+    ('jedihttp_request_bytes', 'Size of request bodies.', BYTES_BUCKETS),
+    ('jedihttp_response_bytes', 'Size of response bodies.', BYTES_BUCKETS),
+)
+
+
+class Histogram(object):
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+
+    def cumulative_counts(self):
+        total = 0
+        for bucket, count in zip(self.buckets, self.counts):
+            total += count
+            yield bucket, total
+        yield '+Inf', self.count
+
+
+class RouteMetrics(object):
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_progress = 0
+        self.histograms = dict((name, Histogram(buckets))
+                               for name, _, buckets in _HISTOGRAMS)
+
+
+def _body_size(body):
+    if isinstance(body, (bytes, type(u''))):
+        return len(encode_string(body))
+    return 0
+
+
+def _labels(route, **extra):
+    labels = [('route', route)] + sorted(extra.items())
+    return '{' + ','.join('{0}="{1}"'.format(name, value)
+                          for name, value in labels) + '}'
+
+
+class MetricsPlugin(object):
+    """
+    Bottle plugin (http://bottlepy.org/docs/dev/plugindev.html) collecting
+    per-route request metrics, exposed in the Prometheus text format on the
+    /metrics route. Install it before the other plugins to include the time
+    they take and the requests they reject.
+    """
+    name = 'metrics'
+    api = 2
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = Lock()
+
+    def setup(self, app):
+        app.route('/metrics', ['GET', 'POST'], self.metrics)
+
+    def apply(self, callback, route):
+        rule = route.rule
+
+        def wrapper(*args, **kwargs):
+            self._start(rule)
+            start = time.time()
+            try:
+                body = callback(*args, **kwargs)
+            except Exception:
+                self._finish(rule, start, error=True)
+                raise
+            if isinstance(body, types.GeneratorType):
+                return self._finish_stream(rule, start, body)
+            self._finish(rule, start, _body_size(body))
+            return body
+        return wrapper
+
+    def _finish_stream(self, rule, start, body):
+        size = 0
+        # Also an error if the client goes away before the end of the stream.
+        error = True
+        try:
+            for chunk in body:
+                size += _body_size(chunk)
+                yield chunk
+            error = False
+        finally:
+            self._finish(rule, start, size, error)
+
+    def _start(self, rule):
+        timing.reset_lock_times()
+        with self._lock:
+            self._routes.setdefault(rule, RouteMetrics()).in_progress += 1
+
+    def _finish(self, rule, start, response_bytes=0, error=False):
+        duration = time.time() - start
+        lock_wait, lock_hold = timing.lock_times()
+        error = error or response.status_code >= 400
+        with self._lock:
+            metrics = self._routes[rule]
+            metrics.in_progress -= 1
+            metrics.requests += 1
+            metrics.errors += int(error)
+            observations = (duration, lock_wait, lock_hold,
+                            max(request.content_length, 0), response_bytes)
+            for (name, _, _), value in zip(_HISTOGRAMS, observations):
+                metrics.histograms[name].observe(value)
+
+    def metrics(self):
+        response.content_type = 'text/plain; version=0.0.4'
+        with self._lock:
+            return '\n'.join(self._render()) + '\n'
+
+    def _render_counter(self, name, help_text, kind, attribute):
+        yield '# HELP {0} {1}'.format(name, help_text)
+        yield '# TYPE {0} {1}'.format(name, kind)
+        for rule in sorted(self._routes):
+            yield '{0}{1} {2}'.format(name,
+                                      _labels(rule),
+                                      getattr(self._routes[rule], attribute))
+
+    def _render_histogram(self, name, help_text):
+        yield '# HELP {0} {1}'.format(name, help_text)
+        yield '# TYPE {0} histogram'.format(name)
+        for rule in sorted(self._routes):
+            histogram = self._routes[rule].histograms[name]
+            for bucket, count in histogram.cumulative_counts():
+                yield '{0}_bucket{1} {2}'.format(name,
+                                                 _labels(rule, le=bucket),
+                                                 count)
+            yield '{0}_sum{1} {2}'.format(name, _labels(rule), histogram.sum)
+            yield '{0}_count{1} {2}'.format(name,
+                                            _labels(rule),
+                                            histogram.count)
+
+    def _render(self):
+        for line in self._render_counter('jedihttp_requests_total',
+                                         'Requests served.',
+                                         'counter',
+                                         'requests'):
+            yield line
+        for line in self._render_counter('jedihttp_request_errors_total',
+                                         'Requests that failed.',
+                                         'counter',
+                                         'errors'):
+            yield line
+        for line in self._render_counter('jedihttp_requests_in_progress',
+                                         'Requests being served.',
+                                         'gauge',
+                                         'in_progress'):
+            yield line
+        for name, help_text, _ in _HISTOGRAMS:
+            for line in self._render_histogram(name, help_text):
+                yield line
+        yield '# HELP jedihttp_queue_depth Threads waiting for Jedi.'
+        yield '# TYPE jedihttp_queue_depth gauge'
+        yield 'jedihttp_queue_depth {0}'.format(timing.queue_depth())
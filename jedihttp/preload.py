@@ -0,0 +1,174 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import contextlib
+import itertools
+import logging
+import time
+from threading import Condition, Thread
+from jedihttp.compatibility import OrderedDict, listvalues
+
+
+class ActivityTracker(object):
+    """Thread-safe count of the interactive requests in progress, so that
+    background work can wait for them to be served first."""
+
+    def __init__(self):
+        self._count = 0
+        self._condition = Condition()
+
+    @contextlib.contextmanager
+    def active(self):
+        with self._condition:
+            self._count += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._count -= 1
+                self._condition.notify_all()
+
+    def count(self):
+        with self._condition:
+            return self._count
+
+    def wait_idle(self, timeout):
+        """Wait until no interactive request is in progress, but no more than
+        |timeout| seconds so that background work is never starved."""
+        expiration = time.time() + timeout
+        with self._condition:
+            while self._count:
+                remaining = expiration - time.time()
+                if remaining <= 0:
+                    return
+                self._condition.wait(remaining)
+
+
+class PreloadJob(object):
+    def __init__(self, job_id, modules, settings):
+        self.id = job_id
+        self.settings = settings
+        self.pending = list(modules)
+        self.done = []
+        self.failed = []
+
+    def is_finished(self):
+        return not self.pending
+
+
+class PreloadQueue(object):
+    """Preload modules in a background thread. Modules are preloaded one at a
+    time by calling |preload| with the list of modules to preload and the Jedi
+    settings of their job, so interactive requests can be served in between.
+    Before each module, |wait_idle| is called if given. Only the last
+    |max_jobs| finished jobs are remembered."""
+
+    def __init__(self, preload, wait_idle=None, max_jobs=100):
+        self._logger = logging.getLogger(__name__)
+        self._preload = preload
+        self._wait_idle = wait_idle
+        self._max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._job_ids = itertools.count(1)
+        self._condition = Condition()
+        self._thread = None
+
+    def submit(self, modules, settings=None):
+        """Queue the preloading of |modules| and return the id of the job."""
+        with self._condition:
+            job = PreloadJob(next(self._job_ids), modules, settings)
+            self._jobs[job.id] = job
+            self._forget_finished_jobs()
+            if self._thread is None:
+                self._thread = Thread(target=self._preload_main)
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify_all()
+        return job.id
+
+    def _forget_finished_jobs(self):
+        finished = [job.id for job in listvalues(self._jobs)
+                    if job.is_finished()]
+        for job_id in finished[:len(finished) - self._max_jobs]:
+            del self._jobs[job_id]
+
+    def _next_module(self):
+        with self._condition:
+            while True:
+                for job in listvalues(self._jobs):
+                    if job.pending:
+                        return job, job.pending[0]
+                self._condition.wait()
+
+    def _preload_main(self):
+        while True:
+            job, module = self._next_module()
+            if self._wait_idle:
+                self._wait_idle()
+            try:
+                self._preload([module], job.settings)
+                succeeded = True
+            except Exception:
+                self._logger.debug('Failed to preload module %s.', module,
+                                   exc_info=True)
+                succeeded = False
+            with self._condition:
+                job.pending.pop(0)
+                (job.done if succeeded else job.failed).append(module)
+                if job.is_finished():
+                    self._logger.info('Preloaded %s modules of job %s.',
+                                      len(job.done), job.id)
+                self._condition.notify_all()
+
+    def _get_job(self, job_id):
+        try:
+            return self._jobs[job_id]
+        except KeyError:
+            raise ValueError('Unknown preload job {0}.'.format(job_id))
+
+    def status(self, job_id=None):
+        """Return the modules done, pending and failed of the job |job_id| or,
+        if None, of all the remembered jobs."""
+        with self._condition:
+            if job_id is None:
+                jobs = listvalues(self._jobs)
+            else:
+                jobs = [self._get_job(job_id)]
+            return {
+                'done':    [module for job in jobs for module in job.done],
+                'pending': [module for job in jobs for module in job.pending],
+                'failed':  [module for job in jobs for module in job.failed]
+            }
+
+    def is_finished(self, job_id):
+        """Return whether the job |job_id| is finished. Only finished jobs are
+        forgotten so an unknown job is considered finished."""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            return job is None or job.is_finished()
+
+    def wait(self, job_id, timeout=None):
+        """Wait for the job |job_id| to finish, but no more than |timeout|
+        seconds if given. Return whether the job is finished."""
+        expiration = None if timeout is None else time.time() + timeout
+        with self._condition:
+            job = self._get_job(job_id)
+            while not job.is_finished():
+                if expiration is None:
+                    self._condition.wait()
+                    continue
+                remaining = expiration - time.time()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return job.is_finished()
@@ -0,0 +1,44 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""Set up of the server and worker processes from the command-line
+arguments. Worker initializers live here rather than in __main__ so that
+workers started from a fresh interpreter can import them."""
+
+import logging
+from jedihttp import handlers
+from jedihttp.cache import LruCache
+from jedihttp.completion_cache import CompletionCache
+
+
+def set_up_logging(log_level):
+    numeric_level = getattr(logging, log_level.upper(), None)
+    if not isinstance(numeric_level, int):
+        raise ValueError('Invalid log level: {0}'.format(log_level))
+
+    # Has to be called before any call to logging.getLogger().
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s',
+                        level=numeric_level)
+
+
+def set_up_jedi(args):
+    """Set up the Jedi state of the current process, be it the server or one
+    of its workers."""
+    handlers.script_cache = LruCache(args.script_cache_size,
+                                     args.script_cache_source_bytes)
+    handlers.completion_cache = CompletionCache(args.completion_cache_size)
+
+
+def set_up_worker(args):
+    set_up_logging(args.log)
+    set_up_jedi(args)
@@ -0,0 +1,125 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import contextlib
+import cProfile
+import logging
+import os
+import random
+import time
+import types
+from bottle import request, response
+
+_PROFILE_HEADER = 'X-JediHTTP-Profile'
+_PROFILE_FILE_HEADER = 'X-JediHTTP-Profile-File'
+
+# Key of the request environ holding the path where a worker process running
+# the request should write its own profile.
+WORKER_PROFILE_KEY = 'jedihttp.worker_profile'
+
+
+def _write_profile(profiler, path):
+    try:
+        profiler.dump_stats(path)
+    except (IOError, OSError):
+        logging.getLogger(__name__).exception('Failed to write profile %s.',
+                                              path)
+
+
+@contextlib.contextmanager
+def profiling(path):
+    """Profile the current thread and write the statistics to |path|. Nothing
+    is profiled if |path| is None."""
+    if path is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _write_profile(profiler, path)
+
+
+def _profile_name(rule):
+    route = rule.strip('/').replace('/', '_') or 'root'
+    now = time.time()
+    return '{0}-{1}-{2:06d}'.format(route,
+                                    time.strftime('%Y%m%d-%H%M%S',
+                                                  time.localtime(now)),
+                                    int(now % 1 * 1000000))
+
+
+class ProfilerPlugin(object):
+    """
+    Bottle plugin (http://bottlepy.org/docs/dev/plugindev.html) profiling
+    requests with cProfile. Requests with the X-JediHTTP-Profile header, and a
+    |sample_rate| fraction of the others, are profiled. The statistics are
+    written in |profile_dir| to a file named after the route and the time of
+    the request, returned in the X-JediHTTP-Profile-File header. Install it
+    after the other plugins to only profile the handlers.
+    """
+    name = 'profiler'
+    api = 2
+
+    def __init__(self, profile_dir, sample_rate=0.0):
+        self._logger = logging.getLogger(__name__)
+        self._profile_dir = profile_dir
+        self._sample_rate = sample_rate
+
+    def _should_profile(self):
+        return (_PROFILE_HEADER in request.headers or
+                random.random() < self._sample_rate)
+
+    def apply(self, callback, route):
+        rule = route.rule
+
+        def wrapper(*args, **kwargs):
+            if not self._should_profile():
+                return callback(*args, **kwargs)
+
+            name = _profile_name(rule)
+            path = os.path.join(self._profile_dir, name + '.pstats')
+            request.environ[WORKER_PROFILE_KEY] = os.path.join(
+                self._profile_dir, name + '-worker.pstats')
+            response.set_header(_PROFILE_FILE_HEADER, name + '.pstats')
+            self._logger.info('Profiling request to %s in %s.', rule, path)
+
+            profiler = cProfile.Profile()
+            body = None
+            try:
+                body = profiler.runcall(callback, *args, **kwargs)
+            finally:
+                if not isinstance(body, types.GeneratorType):
+                    _write_profile(profiler, path)
+            if isinstance(body, types.GeneratorType):
+                return self._profile_stream(profiler, body, path)
+            return body
+        return wrapper
+
+    def _profile_stream(self, profiler, body, path):
+        # Only the production of the chunks is profiled, not the time spent
+        # sending them.
+        try:
+            while True:
+                profiler.enable()
+                try:
+                    chunk = next(body)
+                except StopIteration:
+                    break
+                finally:
+                    profiler.disable()
+                yield chunk
+        finally:
+            _write_profile(profiler, path)
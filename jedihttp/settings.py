@@ -11,8 +11,11 @@
 # See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import contextlib
 import jedi
+import json
 import sys
+from jedihttp.compatibility import iteritems
 
 # For efficiency, we store the default values of the global Jedi settings. See
 # https://jedi.readthedocs.io/en/latest/docs/settings.html
@@ -47,3 +50,86 @@ default_settings = {
     'auto_import_modules':
         auto_import_modules
 }
+
+
+class SettingsProfiles(object):
+    """Named sets of Jedi settings, registered once and referenced by name in
+    the requests instead of sending the settings with each of them."""
+
+    def __init__(self):
+        self._profiles = {}
+
+    def register(self, name, settings):
+        """Register |settings| as the profile |name|, replacing the previous
+        profile of that name. Raise ValueError if a setting is not a Jedi
+        setting."""
+        if not isinstance(settings, dict):
+            raise ValueError('Settings of profile {0} must be an '
+                             'object.'.format(name))
+        for setting in settings:
+            if not hasattr(jedi.settings, setting):
+                raise ValueError('Unknown Jedi setting {0} in profile '
+                                 '{1}.'.format(setting, name))
+        self._profiles[name] = dict(settings)
+
+    def load(self, profiles_file):
+        """Register the profiles of the JSON file |profiles_file|, an object
+        mapping profile names to settings."""
+        with open(profiles_file) as profiles:
+            data = json.load(profiles)
+        if not isinstance(data, dict):
+            raise ValueError('A JSON object was expected in {0}.'.format(
+                profiles_file))
+        for name, settings in iteritems(data):
+            self.register(name, settings)
+
+    def names(self):
+        return sorted(self._profiles)
+
+    def resolve(self, name, settings=None):
+        """Return the settings of the profile |name| overridden by
+        |settings|. Raise ValueError if there is no such profile."""
+        if name not in self._profiles:
+            raise ValueError('Unknown settings profile {0}.'.format(name))
+        resolved = dict(self._profiles[name])
+        resolved.update(settings or {})
+        return resolved
+
+
+class AppliedSettings(object):
+    """Jedi settings applied in the current process. Settings are not reset
+    after each request: a setting is only changed when a request needs a
+    different value than the one already applied, so consecutive requests
+    with the same settings don't touch jedi.settings."""
+
+    def __init__(self):
+        self._defaults = dict(default_settings)
+        self._applied = dict(default_settings)
+
+    def apply(self, settings=None):
+        """Apply |settings| and the default value of all the other settings
+        changed by a previous call."""
+        values = dict(self._defaults)
+        for name, value in iteritems(settings or {}):
+            if name not in self._defaults:
+                self._defaults[name] = getattr(jedi.settings, name, None)
+            values[name] = value
+        for name, value in iteritems(values):
+            if self._applied.get(name) != value:
+                setattr(jedi.settings, name, value)
+                self._applied[name] = value
+
+    @contextlib.contextmanager
+    def overridden(self, name, value):
+        """Set the setting |name| to |value| inside the block only. The
+        settings of the request, and so the keys of the cached scripts, are
+        left untouched."""
+        applied = getattr(jedi.settings, name)
+        if applied == value:
+            yield
+            return
+        setattr(jedi.settings, name, value)
+        try:
+            yield
+        finally:
+            setattr(jedi.settings, name, applied)
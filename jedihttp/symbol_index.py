@@ -0,0 +1,468 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import bisect
+import json
+import logging
+import os
+import parso
+import re
+import time
+from threading import Lock, Thread
+from jedihttp.compatibility import iteritems
+from jedihttp.filtering import filter_items
+from jedihttp.utils import is_skipped_directory, python_files
+
+# Version of the index file format. Index files of another version are
+# ignored.
+INDEX_VERSION = 3
+
+_IDENTIFIER = re.compile(r'[^\W\d]\w*', re.UNICODE)
+
+# Type of the symbols defined by each kind of parso node.
+_SYMBOL_TYPES = {
+    'funcdef': 'function',
+    'classdef': 'class',
+    'expr_stmt': 'statement'
+}
+
+
+def _is_local(node):
+    """Return whether |node| is inside a function."""
+    node = node.parent
+    while node is not None:
+        if node.type in ('funcdef', 'lambdef'):
+            return True
+        node = node.parent
+    return False
+
+
+def _imported_modules(import_nodes):
+    """Return the sorted names of the modules imported by the parso
+    |import_nodes|, prefixed by a dot per level for relative imports. Names
+    imported from a module, like |b| in |from a import b|, are included as
+    |a.b| since they may be submodules."""
+    imports = set()
+    for node in import_nodes:
+        level = node.level if node.type == 'import_from' else 0
+        for path in node.get_paths():
+            imports.add('.' * level + '.'.join(name.value for name in path))
+    return sorted(imports)
+
+
+def parse_file(source):
+    """Parse the Python |source|, bytes or string, and return:
+     - under 'symbols', the functions, classes and variables defined at module
+       or class level as [name, type, line, column] lists sorted by position;
+     - under 'identifiers', the lines where each identifier appears;
+     - under 'imports', the names of the imported modules."""
+    module = parso.parse(source)
+    symbols = []
+    identifiers = {}
+    # Import statements are found from their names rather than by walking the
+    # tree again. Only |from . import *| has none and is left out.
+    import_nodes = set()
+    for value, names in iteritems(module.get_used_names()):
+        identifiers[value] = sorted(set(name.line for name in names))
+        for name in names:
+            # Attributes like |b| in |a.b = 1| are not definitions of the
+            # module.
+            if name.parent.type == 'trailer':
+                continue
+            definition = name.get_definition(import_name_always=True)
+            if (definition is not None and
+                    definition.type in ('import_name', 'import_from')):
+                import_nodes.add(definition)
+                continue
+            if (definition is None or
+                    definition.type not in _SYMBOL_TYPES or
+                    _is_local(definition)):
+                continue
+            symbols.append([name.value,
+                            _SYMBOL_TYPES[definition.type],
+                            name.line,
+                            name.column])
+    symbols.sort(key=lambda symbol: (symbol[2], symbol[3]))
+    return {'symbols': symbols,
+            'identifiers': identifiers,
+            'imports': _imported_modules(import_nodes)}
+
+
+def identifier_at(source, line, column):
+    """Return the identifier of |source| at |line|, starting at 1, and
+    |column|, or None if there is none."""
+    lines = source.splitlines()
+    if not 0 < line <= len(lines):
+        return None
+    for match in _IDENTIFIER.finditer(lines[line - 1]):
+        if match.start() <= column <= match.end():
+            return match.group()
+    return None
+
+
+class SymbolIndex(object):
+    """Index of the symbols defined in the Python files of a project under
+    |root|, built in a background thread by start(). Files are parsed with
+    parso, which is much faster than having Jedi infer their names. If
+    |index_file| is given, the index is loaded from it on start and saved to
+    it once built so that only the files modified in between are parsed
+    again. Before parsing each file, |wait_idle| is called if given."""
+
+    def __init__(self, root, index_file=None, wait_idle=None):
+        self._logger = logging.getLogger(__name__)
+        self._root = os.path.abspath(root)
+        self._index_file = index_file
+        self._wait_idle = wait_idle
+        self._lock = Lock()
+        # Serializes the builds and updates of the index.
+        self._update_lock = Lock()
+        # Modification time, symbols and identifiers of each indexed file,
+        # keyed by path.
+        self._files = {}
+        # Paths of the files where each identifier appears.
+        self._files_by_identifier = {}
+        # Paths of the project files imported by each file, and the reverse.
+        self._imports = {}
+        self._importers = {}
+        # Paths the imports of each file may resolve to, whether indexed or
+        # not, and the reverse. A file is resolved again when one of them is
+        # added or removed.
+        self._candidates = {}
+        self._candidate_importers = {}
+        # Names of all the symbols, sorted case insensitively, their lower
+        # case keys, and the sorted symbols of each name.
+        self._names = []
+        self._keys = []
+        self._symbols_by_name = {}
+        self._complete = False
+
+    def start(self):
+        """Load the index file, if any, and build the index in a background
+        thread. Searches are answered from the loaded index meanwhile."""
+        self._load()
+        thread = Thread(target=self._build_main)
+        thread.daemon = True
+        thread.start()
+
+    def _build_main(self):
+        try:
+            self.build()
+        except Exception:
+            self._logger.exception('Failed to index %s.', self._root)
+
+    def build(self):
+        """Index the files added or modified since the last build and forget
+        the removed ones, then save the index file if any."""
+        with self._update_lock:
+            start = time.time()
+            files = {}
+            for path in python_files(self._root):
+                indexed = self._indexed_file(path)
+                if indexed is not None:
+                    files[path] = indexed
+
+            with self._lock:
+                self._replace_files(files)
+                self._complete = True
+            self._logger.info('Indexed %s files of %s in %.2f seconds.',
+                              len(files), self._root, time.time() - start)
+            self._save()
+
+    def update_paths(self, paths):
+        """Index again the files of |paths| modified since they were indexed
+        and forget the removed ones. Paths that are not Python files of the
+        project are ignored. The index file is not saved: these files are
+        indexed again on the next start."""
+        with self._update_lock:
+            changes = {}
+            for path in paths:
+                path = os.path.abspath(path)
+                if self.contains(path):
+                    changes[path] = self._indexed_file(path)
+            with self._lock:
+                self._update_files(changes)
+
+    def contains(self, path):
+        """Return whether |path| is a Python file of the project."""
+        relative_path = os.path.relpath(path, self._root)
+        components = relative_path.split(os.sep)
+        return (relative_path.endswith('.py') and
+                components[0] != os.pardir and
+                not any(is_skipped_directory(component)
+                        for component in components[:-1]))
+
+    def _indexed_file(self, path):
+        """Return the entry of |path| from the current index, if the file was
+        not modified since, or by indexing it again. Return None if the file
+        does not exist."""
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        indexed = self._files.get(path)
+        if indexed is None or indexed['mtime'] != mtime:
+            indexed = self._index_file_symbols(path, mtime)
+        return indexed
+
+    def _replace_files(self, files):
+        """Replace the indexed files with |files|, keyed by path."""
+        changes = dict((path, None) for path in self._files
+                       if path not in files)
+        changes.update(files)
+        self._update_files(changes)
+
+    def _update_files(self, changes):
+        """Set the entry of each path of |changes| to its value, or remove it
+        if the value is None. Only the entries of the added, modified and
+        removed files are visited."""
+        changed_paths = set()
+        resolved_paths = set()
+        for path, indexed in iteritems(changes):
+            previous = self._files.get(path)
+            if previous is indexed:
+                continue
+            changed_paths.add(path)
+            if previous is not None:
+                del self._files[path]
+                self._remove_entries(path, previous)
+            if indexed is not None:
+                self._files[path] = indexed
+                self._add_entries(path, indexed)
+            if previous is None or indexed is None:
+                resolved_paths.update(
+                    self._candidate_importers.get(path, ()))
+        # Imports of the other files are resolved again only when they may
+        # resolve to an added or removed file.
+        for path in changed_paths | resolved_paths:
+            self._remove_imports(path)
+            if path in self._files:
+                self._add_imports(path)
+
+    def _index_file_symbols(self, path, mtime):
+        if self._wait_idle:
+            self._wait_idle()
+        try:
+            with open(path, 'rb') as source_file:
+                indexed = parse_file(source_file.read())
+        except Exception:
+            self._logger.debug('Failed to index %s.', path, exc_info=True)
+            indexed = {'symbols': [], 'identifiers': {}, 'imports': []}
+        indexed['mtime'] = mtime
+        return indexed
+
+    def _add_entries(self, path, indexed):
+        """Add the identifiers and symbols of the file |path| to the search
+        structures."""
+        for identifier in indexed['identifiers']:
+            self._files_by_identifier.setdefault(identifier, set()).add(path)
+        for name, symbol_type, line, column in indexed['symbols']:
+            symbols = self._symbols_by_name.get(name)
+            if symbols is None:
+                symbols = self._symbols_by_name[name] = []
+                index = self._name_index(name)
+                self._names.insert(index, name)
+                self._keys.insert(index, name.lower())
+            bisect.insort(symbols, (path, symbol_type, line, column))
+
+    def _remove_entries(self, path, indexed):
+        """Remove the identifiers and symbols of the file |path| from the
+        search structures."""
+        for identifier in indexed['identifiers']:
+            paths = self._files_by_identifier[identifier]
+            paths.discard(path)
+            if not paths:
+                del self._files_by_identifier[identifier]
+        for name in set(symbol[0] for symbol in indexed['symbols']):
+            symbols = [symbol for symbol in self._symbols_by_name[name]
+                       if symbol[0] != path]
+            if symbols:
+                self._symbols_by_name[name] = symbols
+                continue
+            del self._symbols_by_name[name]
+            index = self._name_index(name)
+            del self._names[index]
+            del self._keys[index]
+
+    def _name_index(self, name):
+        """Return the index of |name| in self._names, or where to insert it
+        to keep the names sorted by (key, name)."""
+        key = name.lower()
+        index = bisect.bisect_left(self._keys, key)
+        # Names with the same key are few, e.g. |Foo| and |foo|.
+        while (index < len(self._names) and self._keys[index] == key and
+               self._names[index] < name):
+            index += 1
+        return index
+
+    def _add_imports(self, path):
+        """Add the edges from the indexed file |path| to the files it imports
+        to the import graph. Imports of modules outside the project are left
+        out."""
+        imported_paths = set()
+        candidates = set()
+        for name in self._files[path]['imports']:
+            for candidate in self._import_candidates(path, name):
+                candidates.add(candidate)
+                if candidate in self._files:
+                    if candidate != path:
+                        imported_paths.add(candidate)
+                    break
+        for imported_path in imported_paths:
+            self._importers.setdefault(imported_path, set()).add(path)
+        for candidate in candidates:
+            self._candidate_importers.setdefault(candidate, set()).add(path)
+        self._imports[path] = imported_paths
+        self._candidates[path] = candidates
+
+    def _remove_imports(self, path):
+        """Remove the edges from the file |path| from the import graph."""
+        graphs = ((self._imports, self._importers),
+                  (self._candidates, self._candidate_importers))
+        for edges, reverse_edges in graphs:
+            for other_path in edges.pop(path, ()):
+                paths = reverse_edges[other_path]
+                paths.discard(path)
+                if not paths:
+                    del reverse_edges[other_path]
+
+    def _import_candidates(self, path, name):
+        """Yield the paths of the files the module |name| imported by |path|
+        resolves to, in order of preference: the first one indexed is the
+        imported file. If no file matches the whole name, the package
+        matching the longest prefix is imported. Absolute imports are looked
+        up from the directory of |path|, like Jedi does for scripts, then
+        from the root of the project."""
+        directory = os.path.dirname(path)
+        relative_name = name.lstrip('.')
+        level = len(name) - len(relative_name)
+        if level:
+            for _ in range(level - 1):
+                directory = os.path.dirname(directory)
+            directories = [directory]
+        else:
+            directories = [directory, self._root]
+        components = relative_name.split('.') if relative_name else []
+        # Relative imports like |from . import a| may import names of the
+        # package itself.
+        shortest = 0 if level else 1
+        for directory in directories:
+            for length in range(len(components), shortest - 1, -1):
+                module_path = os.path.join(directory, *components[:length])
+                yield module_path + '.py'
+                yield os.path.join(module_path, '__init__.py')
+
+    def importers(self, paths):
+        """Return the paths of |paths| and of the indexed files importing
+        them, directly or not."""
+        with self._lock:
+            found = set(paths)
+            pending = list(found)
+            while pending:
+                for importer in self._importers.get(pending.pop(), ()):
+                    if importer not in found:
+                        found.add(importer)
+                        pending.append(importer)
+            return found
+
+    def import_graph(self, paths=None):
+        """Return the sorted paths of the project files imported by each
+        indexed file of |paths|, or of all of them, and of the files
+        importing it, keyed by path."""
+        with self._lock:
+            if paths is None:
+                paths = self._imports
+            return dict(
+                (path, {
+                    'imports': sorted(self._imports.get(path, ())),
+                    'importers': sorted(self._importers.get(path, ()))
+                }) for path in paths if path in self._files)
+
+    def occurrences(self, identifier):
+        """Return the lines where |identifier| appears in each indexed file
+        containing it, keyed by path."""
+        with self._lock:
+            return dict(
+                (path, self._files[path]['identifiers'][identifier])
+                for path in self._files_by_identifier.get(identifier, ()))
+
+    def is_complete(self):
+        """Return whether the index has been built once."""
+        with self._lock:
+            return self._complete
+
+    def search(self, query, fuzzy=False, max_results=None):
+        """Return at most |max_results| symbols whose name starts with or, if
+        |fuzzy|, fuzzy matches |query|, regardless of case. Names matching
+        with the same case come first."""
+        with self._lock:
+            if fuzzy or not query:
+                names = self._names
+            else:
+                # Names starting with |query| are contiguous in self._names.
+                key = query.lower()
+                start = bisect.bisect_left(self._keys, key)
+                end = bisect.bisect_left(self._keys, key + u'\uffff', start)
+                names = self._names[start:end]
+            names = filter_items(names, query, key=lambda name: name,
+                                 fuzzy=fuzzy, case_sensitive=False)
+            results = []
+            for name in names:
+                for path, symbol_type, line, column in (
+                        self._symbols_by_name[name]):
+                    if max_results is not None and len(results) >= max_results:
+                        return results
+                    results.append({
+                        'name': name,
+                        'type': symbol_type,
+                        'module_path': path,
+                        'line': line,
+                        'column': column
+                    })
+            return results
+
+    def _load(self):
+        if not self._index_file:
+            return
+        try:
+            with open(self._index_file) as index_file:
+                data = json.load(index_file)
+            if (data['version'] != INDEX_VERSION or
+                    data['root'] != self._root):
+                return
+            files = data['files']
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            return
+        with self._lock:
+            self._replace_files(files)
+
+    def _save(self):
+        if not self._index_file:
+            return
+        # self._files is only modified with self._update_lock held, like
+        # here.
+        data = {
+            'version': INDEX_VERSION,
+            'root': self._root,
+            'files': self._files
+        }
+        temporary_path = self._index_file + '.tmp'
+        try:
+            with open(temporary_path, 'w') as index_file:
+                json.dump(data, index_file)
+            # os.rename doesn't overwrite an existing file on Windows.
+            if os.path.exists(self._index_file):
+                os.remove(self._index_file)
+            os.rename(temporary_path, self._index_file)
+        except (IOError, OSError):
+            self._logger.exception('Failed to save the index of %s in %s.',
+                                   self._root, self._index_file)
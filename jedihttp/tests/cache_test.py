@@ -0,0 +1,63 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+
+from jedihttp.cache import LruCache
+from hamcrest import assert_that, equal_to, has_entries, is_
+
+
+def test_lru_cache_get_put():
+    cache = LruCache(max_entries=2)
+    cache.put('a', 1)
+
+    assert_that(cache.get('a'), equal_to(1))
+    assert_that(cache.get('b'), is_(None))
+    assert_that(cache.stats(), has_entries({'entries': 1,
+                                            'hits': 1,
+                                            'misses': 1}))
+
+
+def test_lru_cache_evict_least_recently_used():
+    cache = LruCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+
+    assert_that('a' in cache, equal_to(True))
+    assert_that('b' in cache, equal_to(False))
+    assert_that('c' in cache, equal_to(True))
+
+
+def test_lru_cache_byte_budget():
+    cache = LruCache(max_entries=10, max_bytes=10)
+    cache.put('a', 1, size=6)
+    cache.put('b', 2, size=6)
+
+    assert_that(len(cache), equal_to(1))
+    assert_that('b' in cache, equal_to(True))
+
+    cache.put('c', 3, size=11)
+    assert_that('c' in cache, equal_to(False))
+    assert_that(cache.stats(), has_entries({'entries': 1, 'bytes': 6}))
+
+
+def test_lru_cache_invalidate():
+    cache = LruCache(max_entries=10, max_bytes=10)
+    cache.put('a', 1, size=2)
+    cache.put('b', 2, size=3)
+    cache.put('c', 3, size=4)
+
+    assert_that(cache.invalidate(lambda key, value: value % 2), equal_to(2))
+    assert_that('b' in cache, equal_to(True))
+    assert_that(cache.stats(), has_entries({'entries': 1, 'bytes': 3}))
@@ -0,0 +1,83 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from __future__ import absolute_import
+
+import json
+from .utils import msgpack_only
+from jedihttp import codec
+from nose.tools import raises
+from hamcrest import assert_that, equal_to, instance_of
+
+
+DATA = {
+    'completions': [{
+        'name': u'caf\xe9',
+        'line': 1,
+        'column': None,
+        'is_keyword': False
+    }]
+}
+
+
+def test_dumps():
+    content = codec.dumps(DATA)
+
+    assert_that(content, instance_of(bytes))
+    assert_that(json.loads(content.decode('utf-8')), equal_to(DATA))
+
+
+def test_loads():
+    content = json.dumps(DATA)
+
+    assert_that(codec.loads(content), equal_to(DATA))
+    assert_that(codec.loads(content.encode('utf-8')), equal_to(DATA))
+
+
+@raises(ValueError)
+def test_loads_invalid_json():
+    codec.loads(b'{"source":')
+
+
+def test_is_msgpack():
+    assert_that(codec.is_msgpack('application/msgpack'), equal_to(True))
+    assert_that(codec.is_msgpack('application/x-msgpack; charset=binary'),
+                equal_to(True))
+    assert_that(codec.is_msgpack('application/json'), equal_to(False))
+    assert_that(codec.is_msgpack(None), equal_to(False))
+
+
+@msgpack_only
+def test_accepts_msgpack():
+    assert_that(codec.accepts_msgpack(None), equal_to(False))
+    assert_that(codec.accepts_msgpack('*/*'), equal_to(False))
+    assert_that(codec.accepts_msgpack('application/msgpack'), equal_to(True))
+    assert_that(codec.accepts_msgpack('application/msgpack, */*'),
+                equal_to(True))
+    assert_that(codec.accepts_msgpack('application/json, '
+                                      'application/msgpack;q=0.5'),
+                equal_to(False))
+
+
+@msgpack_only
+def test_msgpack_dumps_and_loads():
+    content = codec.msgpack_dumps(DATA)
+
+    assert_that(content, instance_of(bytes))
+    assert_that(codec.msgpack_loads(content), equal_to(DATA))
+
+
+@msgpack_only
+@raises(ValueError)
+def test_msgpack_loads_invalid_content():
+    codec.msgpack_loads(b'\xc1')
@@ -0,0 +1,86 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+
+from collections import namedtuple
+from jedihttp.completion_cache import CompletionCache
+from hamcrest import assert_that, contains, is_
+
+Completion = namedtuple('Completion', 'name')
+COMPLETIONS = [Completion('path'), Completion('pardir'), Completion('Pattern'),
+               Completion('sep')]
+
+
+def request(source, col):
+    return {
+        'source': source,
+        'line': 2,
+        'col': col,
+        'source_path': '/file.py'
+    }
+
+
+def test_completion_cache_narrow():
+    cache = CompletionCache(max_entries=2)
+    cache.put(request('import os\nos.p\n', 4), COMPLETIONS)
+
+    assert_that(cache.get(request('import os\nos.pat\n', 6)),
+                contains(Completion('path')))
+
+
+def test_completion_cache_narrow_case_insensitive():
+    cache = CompletionCache(max_entries=2)
+    cache.put(request('import os\nos.\n', 3), COMPLETIONS)
+
+    assert_that(cache.get(request('import os\nos.pat\n', 6),
+                          case_sensitive=False),
+                contains(Completion('path'), Completion('Pattern')))
+
+
+def test_completion_cache_miss_on_shorter_word():
+    cache = CompletionCache(max_entries=2)
+    cache.put(request('import os\nos.pa\n', 5), COMPLETIONS)
+
+    assert_that(cache.get(request('import os\nos.p\n', 4)), is_(None))
+
+
+def test_completion_cache_miss_on_buffer_change():
+    cache = CompletionCache(max_entries=2)
+    cache.put(request('import os\nos.p\n', 4), COMPLETIONS)
+
+    assert_that(cache.get(request('import sys\nos.pa\n', 5)), is_(None))
+    assert_that(cache.get(request('import os\nos.pa\nx = 1', 5)), is_(None))
+    assert_that(cache.get(request('import os\nos.pa\n', 5)),
+                contains(Completion('path'), Completion('pardir')))
+
+
+def test_completion_cache_invalidate():
+    Definition = namedtuple('Definition', 'name module_path')
+    cache = CompletionCache(max_entries=3)
+    cache.put(request('import os\nos.p\n', 4),
+              [Definition('path', '/os.py')], ['/os.py'])
+    cache.put(request('import re\nre.c\n', 4),
+              [Definition('compile', '/re.py')], ['/re.py'])
+    # No completion comes from settings.py but it was loaded to find them.
+    cache.put(request('import settings\nsettings.NE\n', 11), [],
+              ['/settings.py'])
+
+    assert_that(cache.invalidate(set(['/os.py', '/settings.py'])), is_(2))
+    assert_that(cache.get(request('import os\nos.p\n', 4)), is_(None))
+    assert_that(cache.get(request('import settings\nsettings.NEW\n', 12)),
+                is_(None))
+    assert_that(cache.get(request('import re\nre.c\n', 4)),
+                contains(Definition('compile', '/re.py')))
+
+    # Completions of a changed file are removed as well.
+    assert_that(cache.invalidate(set(['/file.py'])), is_(1))
@@ -0,0 +1,158 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from bottle import BaseRequest, Bottle, request
+from webob import Request
+from webtest import TestApp
+from jedihttp.compression_plugin import (CompressionPlugin, ContentTooLarge,
+                                         REQUEST_BODY_KEY, accepted_encoding,
+                                         compress, decompress)
+from nose.tools import raises
+from hamcrest import (assert_that, contains_string, equal_to, is_not,
+                      has_key)
+
+BODY = b'{"source": "' + b'import os\\n' * 100 + b'"}'
+
+
+def echo_app(threshold=None):
+    app = Bottle()
+
+    @app.post('/echo')
+    def echo():
+        return request.environ.get(REQUEST_BODY_KEY, request.body.read())
+
+    app.install(CompressionPlugin(threshold))
+    return app
+
+
+def compression_app(threshold=None):
+    return TestApp(echo_app(threshold))
+
+
+def post_echo(threshold, headers=None):
+    # TestApp decompresses the responses so the application is called
+    # directly.
+    echo_request = Request.blank('/echo',
+                                 method='POST',
+                                 body=BODY,
+                                 headers=headers)
+    return echo_request.get_response(echo_app(threshold))
+
+
+def test_accepted_encoding():
+    assert_that(accepted_encoding(None), equal_to(None))
+    assert_that(accepted_encoding('identity'), equal_to(None))
+    assert_that(accepted_encoding('gzip, deflate'), equal_to('gzip'))
+    assert_that(accepted_encoding('deflate'), equal_to('deflate'))
+    assert_that(accepted_encoding('gzip;q=0.5, deflate'), equal_to('deflate'))
+    assert_that(accepted_encoding('gzip;q=0, *'), equal_to('deflate'))
+
+
+def test_compress_and_decompress():
+    for encoding in ('gzip', 'deflate'):
+        compressed = compress(BODY, encoding)
+        assert_that(len(compressed) < len(BODY), equal_to(True))
+        assert_that(decompress(compressed, encoding), equal_to(BODY))
+
+
+@raises(ContentTooLarge)
+def test_decompress_too_large():
+    decompress(compress(BODY, 'gzip'), 'gzip', max_bytes=10)
+
+
+def test_decompress_max_bytes():
+    assert_that(decompress(compress(BODY, 'gzip'), 'gzip', len(BODY)),
+                equal_to(BODY))
+
+
+@raises(ValueError)
+def test_decompress_truncated_gzip():
+    decompress(compress(BODY, 'gzip')[:-4], 'gzip')
+
+
+@raises(ValueError)
+def test_decompress_truncated_deflate():
+    decompress(compress(BODY, 'deflate')[:-2], 'deflate')
+
+
+def test_decompress_request():
+    app = compression_app()
+    response = app.post('/echo',
+                        compress(BODY, 'gzip'),
+                        headers={'Content-Encoding': 'gzip'})
+
+    assert_that(response.body, equal_to(BODY))
+    assert_that(response.headers, is_not(has_key('Content-Encoding')))
+
+
+def test_decompress_invalid_request():
+    app = compression_app()
+    response = app.post('/echo',
+                        BODY,
+                        headers={'Content-Encoding': 'gzip'},
+                        expect_errors=True)
+
+    assert_that(response.status_int, equal_to(400))
+
+
+def test_decompress_truncated_request():
+    app = compression_app()
+    response = app.post('/echo',
+                        compress(BODY, 'gzip')[:-4],
+                        headers={'Content-Encoding': 'gzip'},
+                        expect_errors=True)
+
+    assert_that(response.status_int, equal_to(400))
+    assert_that(response.text, contains_string('Truncated gzip content.'))
+
+
+def test_decompress_request_too_large():
+    app = compression_app()
+    response = app.post('/echo',
+                        compress(b' ' * (BaseRequest.MEMFILE_MAX + 1),
+                                 'gzip'),
+                        headers={'Content-Encoding': 'gzip'},
+                        expect_errors=True)
+
+    assert_that(response.status_int, equal_to(413))
+
+
+def test_unsupported_request_encoding():
+    app = compression_app()
+    response = app.post('/echo',
+                        BODY,
+                        headers={'Content-Encoding': 'br'},
+                        expect_errors=True)
+
+    assert_that(response.status_int, equal_to(415))
+
+
+def test_compress_response():
+    response = post_echo(100, {'Accept-Encoding': 'gzip'})
+
+    assert_that(response.headers['Content-Encoding'], equal_to('gzip'))
+    assert_that(decompress(response.body, 'gzip'), equal_to(BODY))
+
+
+def test_compress_response_below_threshold():
+    response = post_echo(len(BODY) + 1, {'Accept-Encoding': 'gzip'})
+
+    assert_that(response.headers, is_not(has_key('Content-Encoding')))
+    assert_that(response.body, equal_to(BODY))
+
+
+def test_compress_response_not_accepted():
+    response = post_echo(100)
+
+    assert_that(response.headers, is_not(has_key('Content-Encoding')))
+    assert_that(response.body, equal_to(BODY))
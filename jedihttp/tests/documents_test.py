@@ -0,0 +1,74 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+
+from jedihttp.documents import DocumentStore, apply_edit
+from nose.tools import raises
+from hamcrest import assert_that, equal_to
+
+
+def edit(start_line, start_col, end_line, end_col, text):
+    return {
+        'start': {'line': start_line, 'col': start_col},
+        'end': {'line': end_line, 'col': end_col},
+        'text': text
+    }
+
+
+def test_apply_edit_insert():
+    assert_that(apply_edit('import os\nos.\n', edit(2, 3, 2, 3, 'path')),
+                equal_to('import os\nos.path\n'))
+
+
+def test_apply_edit_replace_across_lines():
+    assert_that(apply_edit('a = 1\nb = 2\nc = 3', edit(1, 4, 3, 1, '0\nd')),
+                equal_to('a = 0\nd = 3'))
+
+
+def test_apply_edit_whole_text():
+    assert_that(apply_edit('a = 1', {'text': 'b = 2'}), equal_to('b = 2'))
+
+
+@raises(ValueError)
+def test_apply_edit_line_out_of_range():
+    apply_edit('a = 1\n', edit(3, 0, 3, 0, 'b'))
+
+
+@raises(ValueError)
+def test_apply_edit_col_out_of_range():
+    apply_edit('a = 1\nb = 2', edit(1, 6, 1, 6, 'b'))
+
+
+def test_document_store_change():
+    documents = DocumentStore()
+    documents.open('/file.py', 'import os\n', version=1)
+    documents.change('/file.py', [edit(2, 0, 2, 0, 'os.'),
+                                  edit(2, 3, 2, 3, 'pa')], version=2)
+
+    assert_that(documents.get_text('/file.py'),
+                equal_to('import os\nos.pa'))
+
+
+@raises(ValueError)
+def test_document_store_change_old_version():
+    documents = DocumentStore()
+    documents.open('/file.py', 'import os\n', version=2)
+    documents.change('/file.py', [edit(1, 0, 1, 0, '#')], version=1)
+
+
+@raises(ValueError)
+def test_document_store_closed_document():
+    documents = DocumentStore()
+    documents.open('/file.py', 'import os\n')
+    documents.close('/file.py')
+    documents.get_text('/file.py')
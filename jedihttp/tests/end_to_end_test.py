@@ -14,16 +14,22 @@
 
 import os
 import requests
+import json
+import socket
+import stat
 import subprocess
 import sys
+import tempfile
 import time
-from jedihttp import hmaclib
-from jedihttp.compatibility import decode_string
+from jedihttp import codec, hmaclib
+from jedihttp.compatibility import decode_string, encode_string
+from jedihttp.compression_plugin import compress, decompress
 from jedihttp.tests import utils
-from jedihttp.tests.utils import (process_is_running, py2only, read_file,
-                                  wait_process_shutdown, with_jedihttp)
+from jedihttp.tests.utils import (msgpack_only, process_is_running, py2only,
+                                  read_file, unix_only, wait_process_shutdown,
+                                  with_jedihttp)
 from os import path
-from hamcrest import assert_that, equal_to
+from hamcrest import assert_that, contains_string, equal_to, has_key
 
 try:
     from http import client as httplib
@@ -200,3 +206,268 @@ def test_client_shutdown_from_handler(jedihttp):
 def test_client_shutdown_from_watchdog(jedihttp):
     wait_process_shutdown(jedihttp, timeout=10)
     assert_that(process_is_running(jedihttp), equal_to(False))
+
+
+@with_jedihttp(setup_jedihttp(['--workers', '2']), teardown_jedihttp)
+def test_client_request_with_workers(jedihttp):
+    filepath = utils.fixture_filepath('basic.py')
+    request_data = {
+        'source': read_file(filepath),
+        'line': 7,
+        'col': 2,
+        'source_path': filepath
+    }
+
+    response = requests.post('http://127.0.0.1:{0}/completions'.format(PORT),
+                             json=request_data,
+                             auth=HmacAuth(SECRET))
+
+    assert_that(response.status_code, equal_to(httplib.OK))
+
+    hmachelper = hmaclib.JediHTTPHmacHelper(SECRET)
+    assert_that(hmachelper.is_response_authenticated(response.headers,
+                                                     response.content))
+
+
+@with_jedihttp(setup_jedihttp(['--workers', '1']), teardown_jedihttp)
+def test_client_stream_request(jedihttp):
+    filepath = utils.fixture_filepath('basic.py')
+    request_data = {
+        'source': read_file(filepath),
+        'line': 7,
+        'col': 2,
+        'source_path': filepath,
+        'stream': True
+    }
+
+    response = requests.post('http://127.0.0.1:{0}/completions'.format(PORT),
+                             json=request_data,
+                             auth=HmacAuth(SECRET))
+
+    assert_that(response.status_code, equal_to(httplib.OK))
+
+    hmachelper = hmaclib.JediHTTPHmacHelper(SECRET)
+    assert_that(hmachelper.is_response_stream_authenticated(response.content))
+    assert_that(not hmachelper.is_response_stream_authenticated(
+        response.content.replace(b'"a"', b'"c"')))
+
+
+def warmup_file(modules):
+    with tempfile.NamedTemporaryFile('w', suffix='.json',
+                                     delete=False) as warmup:
+        json.dump({'modules': modules}, warmup)
+    return warmup.name
+
+
+WARMUP_FILE = warmup_file({'os': 1})
+
+
+@with_jedihttp(setup_jedihttp(['--warmup-from', WARMUP_FILE]),
+               teardown_jedihttp)
+def test_client_warmup(jedihttp):
+    filepath = utils.fixture_filepath('socket_module.py')
+    request_data = {
+        'source': read_file(filepath),
+        'line': 4,
+        'col': 4,
+        'source_path': filepath
+    }
+
+    response = requests.post('http://127.0.0.1:{0}/completions'.format(PORT),
+                             json=request_data,
+                             auth=HmacAuth(SECRET))
+    assert_that(response.status_code, equal_to(httplib.OK))
+
+    requests.post('http://127.0.0.1:{0}/shutdown'.format(PORT),
+                  auth=HmacAuth(SECRET))
+    wait_process_shutdown(jedihttp)
+
+    with open(WARMUP_FILE) as warmup:
+        assert_that(json.load(warmup)['modules'], has_key('socket'))
+    os.remove(WARMUP_FILE)
+
+
+def config_file(options):
+    with tempfile.NamedTemporaryFile('w', suffix='.json',
+                                     delete=False) as config:
+        json.dump(options, config)
+    return config.name
+
+
+CONFIG_FILE = config_file({'threads': 2, 'channel-timeout': 30})
+
+
+@with_jedihttp(setup_jedihttp(['--config', CONFIG_FILE]), teardown_jedihttp)
+def test_client_keep_alive(jedihttp):
+    hmachelper = hmaclib.JediHTTPHmacHelper(SECRET)
+    connection = httplib.HTTPConnection('127.0.0.1', PORT)
+    try:
+        for _ in range(2):
+            body = encode_string(json.dumps({}))
+            headers = {'Content-Type': 'application/json'}
+            hmachelper.sign_request_headers(headers, 'POST', '/healthy', body)
+            connection.request('POST', '/healthy', body, headers)
+            response = connection.getresponse()
+            response.read()
+
+            assert_that(response.status, equal_to(httplib.OK))
+            assert_that(response.will_close, equal_to(False))
+    finally:
+        connection.close()
+        os.remove(CONFIG_FILE)
+
+
+@with_jedihttp(setup_jedihttp(), teardown_jedihttp)
+def test_client_metrics(jedihttp):
+    requests.post('http://127.0.0.1:{0}/healthy'.format(PORT),
+                  auth=HmacAuth(SECRET))
+    response = requests.get('http://127.0.0.1:{0}/metrics'.format(PORT),
+                            auth=HmacAuth(SECRET))
+
+    assert_that(response.status_code, equal_to(httplib.OK))
+    assert_that(response.text,
+                contains_string('jedihttp_requests_total{route="/healthy"} 1'))
+
+
+@with_jedihttp(setup_jedihttp(['--compression-threshold', '0']),
+               teardown_jedihttp)
+def test_client_compression(jedihttp):
+    filepath = utils.fixture_filepath('goto.py')
+    request_data = {
+        'source': read_file(filepath),
+        'line': 10,
+        'col': 3,
+        'source_path': filepath
+    }
+
+    response = requests.post(
+        'http://127.0.0.1:{0}/gotodefinition'.format(PORT),
+        data=compress(encode_string(json.dumps(request_data)), 'gzip'),
+        headers={'Content-Type': 'application/json',
+                 'Content-Encoding': 'gzip',
+                 'Accept-Encoding': 'gzip'},
+        auth=HmacAuth(SECRET),
+        stream=True)
+    content = response.raw.read(decode_content=False)
+
+    assert_that(response.status_code, equal_to(httplib.OK))
+    assert_that(response.headers['Content-Encoding'], equal_to('gzip'))
+
+    # The HMAC is computed over the compressed body.
+    hmachelper = hmaclib.JediHTTPHmacHelper(SECRET)
+    assert_that(hmachelper.is_response_authenticated(response.headers,
+                                                     content))
+    assert_that(json.loads(decode_string(decompress(content, 'gzip'))),
+                has_key('definitions'))
+
+
+@msgpack_only
+@with_jedihttp(setup_jedihttp(), teardown_jedihttp)
+def test_client_msgpack(jedihttp):
+    filepath = utils.fixture_filepath('goto.py')
+    request_data = {
+        'source': read_file(filepath),
+        'line': 10,
+        'col': 3,
+        'source_path': filepath
+    }
+
+    response = requests.post(
+        'http://127.0.0.1:{0}/gotodefinition'.format(PORT),
+        data=codec.msgpack_dumps(request_data),
+        headers={'Content-Type': 'application/msgpack',
+                 'Accept': 'application/msgpack'},
+        auth=HmacAuth(SECRET))
+
+    assert_that(response.status_code, equal_to(httplib.OK))
+    assert_that(response.headers['Content-Type'],
+                equal_to('application/msgpack'))
+
+    hmachelper = hmaclib.JediHTTPHmacHelper(SECRET)
+    assert_that(hmachelper.is_response_authenticated(response.headers,
+                                                     response.content))
+    assert_that(codec.msgpack_loads(response.content),
+                has_key('definitions'))
+
+
+class UnixHTTPConnection(httplib.HTTPConnection):
+    def __init__(self, unix_socket):
+        httplib.HTTPConnection.__init__(self, 'localhost')
+        self._unix_socket = unix_socket
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self._unix_socket)
+
+
+UNIX_SOCKET = path.join(tempfile.gettempdir(),
+                        'jedihttp-{0}.sock'.format(os.getpid()))
+
+
+def post_unix_socket(endpoint, request_data):
+    body = encode_string(json.dumps(request_data))
+    # The Host header is not checked on a Unix socket.
+    headers = {'Content-Type': 'application/json', 'Host': 'example.com'}
+    hmaclib.JediHTTPHmacHelper(SECRET).sign_request_headers(headers,
+                                                            'POST',
+                                                            endpoint,
+                                                            body)
+    connection = UnixHTTPConnection(UNIX_SOCKET)
+    try:
+        connection.request('POST', endpoint, body, headers)
+        response = connection.getresponse()
+        return response.status, json.loads(decode_string(response.read()))
+    finally:
+        connection.close()
+
+
+def setup_jedihttp_unix_socket():
+    hmac_file = hmaclib.temporary_hmac_secret_file(SECRET)
+    jedihttp = utils.safe_popen([utils.python(),
+                                 PATH_TO_JEDIHTTP,
+                                 '--unix-socket', UNIX_SOCKET,
+                                 '--log', 'debug',
+                                 '--hmac-file-secret', hmac_file],
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT)
+    expiration = time.time() + 5
+    while time.time() < expiration:
+        try:
+            if post_unix_socket('/ready', {})[1]:
+                return jedihttp
+        except socket.error:
+            time.sleep(0.1)
+    raise RuntimeError('Waited for JediHTTP to be ready for 5 seconds, '
+                       'aborting.')
+
+
+def teardown_jedihttp_unix_socket(jedihttp):
+    try:
+        post_unix_socket('/shutdown', {})
+    except socket.error:
+        pass
+
+    try:
+        wait_process_shutdown(jedihttp)
+    except RuntimeError:
+        jedihttp.terminate()
+
+    stdout, _ = jedihttp.communicate()
+    sys.stdout.write(decode_string(stdout))
+
+
+@unix_only
+@with_jedihttp(setup_jedihttp_unix_socket, teardown_jedihttp_unix_socket)
+def test_client_unix_socket(jedihttp):
+    assert_that(stat.S_IMODE(os.stat(UNIX_SOCKET).st_mode), equal_to(0o600))
+
+    filepath = utils.fixture_filepath('goto.py')
+    status, response = post_unix_socket('/gotodefinition', {
+        'source': read_file(filepath),
+        'line': 10,
+        'col': 3,
+        'source_path': filepath
+    })
+
+    assert_that(status, equal_to(httplib.OK))
+    assert_that(response, has_key('definitions'))
@@ -0,0 +1,96 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+from .utils import linux_only
+from jedihttp.file_watcher import FileWatcher
+from hamcrest import assert_that, equal_to
+from threading import Event
+
+
+def watch(root, **kwargs):
+    """Start watching |root| and return the watcher with a function returning
+    the next changed paths."""
+    changes = []
+    changed = Event()
+
+    def on_change(paths):
+        changes.append(paths)
+        changed.set()
+
+    watcher = FileWatcher(root, debounce=0.05, poll_interval=0.1, **kwargs)
+    watcher.subscribe(on_change)
+    watcher.start()
+
+    def next_change():
+        assert_that(changed.wait(5), equal_to(True))
+        changed.clear()
+        return changes.pop(0)
+
+    return watcher, next_change
+
+
+def write_file(path, content=''):
+    with open(path, 'w') as source_file:
+        source_file.write(content)
+
+
+def check_changes(root, **kwargs):
+    module_path = os.path.join(root, 'module.py')
+    write_file(module_path)
+    watcher, next_change = watch(root, **kwargs)
+    try:
+        package_path = os.path.join(root, 'package')
+        os.mkdir(package_path)
+        init_path = os.path.join(package_path, '__init__.py')
+        write_file(init_path)
+        write_file(os.path.join(root, 'README.md'))
+        assert_that(next_change(), equal_to(set([init_path])))
+
+        os.remove(module_path)
+        assert_that(next_change(), equal_to(set([module_path])))
+    finally:
+        watcher.stop()
+    return watcher
+
+
+def test_file_watcher_polling():
+    root = tempfile.mkdtemp()
+    try:
+        watcher = check_changes(root, use_inotify=False)
+        assert_that(watcher.backend, equal_to('polling'))
+    finally:
+        shutil.rmtree(root)
+
+
+@linux_only
+def test_file_watcher_inotify():
+    root = tempfile.mkdtemp()
+    try:
+        watcher = check_changes(root)
+        assert_that(watcher.backend, equal_to('inotify'))
+    finally:
+        shutil.rmtree(root)
+
+
+def test_file_watcher_too_many_directories():
+    root = tempfile.mkdtemp()
+    try:
+        watcher = check_changes(root, max_watches=0)
+        assert_that(watcher.backend, equal_to('polling'))
+    finally:
+        shutil.rmtree(root)
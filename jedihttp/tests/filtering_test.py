@@ -0,0 +1,48 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+
+from jedihttp.filtering import filter_items, fuzzy_score
+from hamcrest import assert_that, contains, equal_to, is_
+
+WORDS = ['path', 'pardir', 'PathLike', 'pipe', 'sep', 'getpid']
+
+
+def identity(word):
+    return word
+
+
+def test_fuzzy_score():
+    assert_that(fuzzy_score('pth', 'path'), equal_to(1))
+    assert_that(fuzzy_score('pth', 'pipe'), is_(None))
+    assert_that(fuzzy_score('', 'path'), equal_to(0))
+
+
+def test_filter_items_prefix():
+    assert_that(filter_items(WORDS, 'pa', key=identity),
+                contains('path', 'pardir'))
+
+
+def test_filter_items_prefix_case_insensitive():
+    assert_that(filter_items(WORDS, 'Pa', key=identity, case_sensitive=False),
+                contains('PathLike', 'path', 'pardir'))
+
+
+def test_filter_items_fuzzy():
+    assert_that(filter_items(WORDS, 'pi', key=identity, fuzzy=True),
+                contains('pipe', 'pardir', 'getpid'))
+
+
+def test_filter_items_max_results():
+    assert_that(filter_items(WORDS, key=identity, max_results=2),
+                contains('path', 'pardir'))
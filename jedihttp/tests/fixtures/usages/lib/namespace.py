@@ -0,0 +1 @@
+NAMESPACE = 'namespace'
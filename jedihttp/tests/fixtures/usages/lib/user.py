@@ -0,0 +1,5 @@
+from .constants import NAME
+
+
+def user():
+    return NAME
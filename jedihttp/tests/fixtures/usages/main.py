@@ -0,0 +1,5 @@
+from lib.constants import NAME
+
+
+def main():
+    return NAME
@@ -0,0 +1 @@
+NAME = 'other'
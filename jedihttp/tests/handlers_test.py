@@ -14,15 +14,24 @@
 
 from __future__ import absolute_import
 
-from .utils import fixture_filepath, py3only, read_file
+from .utils import fixture_filepath, msgpack_only, py3only, read_file
 from webtest import TestApp
-from jedihttp import handlers
+from jedihttp import codec, handlers
+from jedihttp.preload import PreloadQueue
+from jedihttp.symbol_index import SymbolIndex
 from nose.tools import ok_
 from hamcrest import (assert_that, only_contains, contains, contains_string,
                       contains_inanyorder, all_of, is_not, has_key, has_item,
-                      has_items, has_entry, has_entries, equal_to, is_, empty)
+                      has_items, has_entry, has_entries, has_length,
+                      equal_to, is_, empty, starts_with)
 
 import bottle
+import json
+import os
+import parso
+import shutil
+import tempfile
+import threading
 bottle.debug(True)
 
 
@@ -46,6 +55,23 @@ def test_ready():
     ok_(app.post('/ready'))
 
 
+def test_ready_during_warmup():
+    app = TestApp(handlers.app)
+    preload_event = threading.Event()
+    preload_queue = handlers.preload_queue
+    handlers.preload_queue = PreloadQueue(
+        lambda modules, settings: preload_event.wait())
+    handlers.warmup_job = handlers.preload_queue.submit(['os'])
+    try:
+        assert_that(app.post('/ready').json, equal_to(False))
+        preload_event.set()
+        handlers.preload_queue.wait(handlers.warmup_job, 5)
+        assert_that(app.post('/ready').json, equal_to(True))
+    finally:
+        handlers.preload_queue = preload_queue
+        handlers.warmup_job = None
+
+
 # XXX(vheon): test for unicode, specially for python3
 # where encoding must be specified
 def test_completion():
@@ -66,6 +92,271 @@ def test_completion():
                                        completion_entry('b')))
 
 
+def test_completion_filtering():
+    app = TestApp(handlers.app)
+    filepath = fixture_filepath('goto.py')
+    request_data = {
+        'source': read_file(filepath),
+        'line': 10,
+        'col': 12,
+        'source_path': filepath,
+        'prefix': 'fo',
+        'max_results': 1
+    }
+
+    completions = app.post_json('/completions',
+                                request_data).json['completions']
+
+    assert_that(completions, contains(has_entry('name', starts_with('fo'))))
+
+
+def test_completion_stream():
+    app = TestApp(handlers.app)
+    filepath = fixture_filepath('basic.py')
+    request_data = {
+        'source': read_file(filepath),
+        'line': 7,
+        'col': 2,
+        'source_path': filepath,
+        'stream': True
+    }
+
+    response = app.post_json('/completions', request_data)
+
+    assert_that(response.content_type, equal_to('application/x-ndjson'))
+    completions = [json.loads(line) for line in response.text.splitlines()]
+    assert_that(completions, only_contains(valid_completions()))
+    assert_that(completions, has_items(completion_entry('a'),
+                                       completion_entry('b')))
+
+
+def test_completion_without_docstrings():
+    app = TestApp(handlers.app)
+    filepath = fixture_filepath('goto.py')
+    request_data = {
+        'source': read_file(filepath),
+        'line': 10,
+        'col': 12,
+        'source_path': filepath
+    }
+    docstrings = dict(
+        (completion['name'], completion['docstring'])
+        for completion in app.post_json('/completions',
+                                        request_data).json['completions'])
+
+    request_data['docstrings'] = False
+    completions = app.post_json('/completions',
+                                request_data).json['completions']
+
+    assert_that(completions,
+                only_contains(all_of(has_key('handle'),
+                                     is_not(has_key('docstring')))))
+    completion = [completion for completion in completions
+                  if completion['name'] == 'f'][0]
+    resolved = app.post_json('/resolve', {
+        'source_path': filepath,
+        'handle': completion['handle']
+    }).json
+    assert_that(resolved, has_entry('docstring', docstrings['f']))
+
+
+def test_resolve_expired_handle():
+    app = TestApp(handlers.app)
+    handle = '{0}:-1:0'.format(handlers._handle_nonce())
+    response = app.post_json('/resolve',
+                             {'source_path': '/file.py', 'handle': handle},
+                             expect_errors=True)
+    assert_that(response.status_int, equal_to(500))
+    assert_that(response.json, has_entries({
+        'exception': {'TYPE': 'ValueError'},
+        'message': contains_string('expired')
+    }))
+
+
+def test_resolve_foreign_handle():
+    app = TestApp(handlers.app)
+    filepath = fixture_filepath('goto.py')
+    request_data = {
+        'source': read_file(filepath),
+        'line': 10,
+        'col': 12,
+        'source_path': filepath,
+        'docstrings': False
+    }
+    handle = app.post_json('/completions',
+                           request_data).json['completions'][0]['handle']
+    # Same token and index from a process with another nonce, e.g. another
+    # worker or a worker started again.
+    nonce, token, index = handle.split(':')
+    foreign_handle = 'other:{0}:{1}'.format(token, index)
+
+    response = app.post_json('/resolve',
+                             {'source_path': filepath,
+                              'handle': foreign_handle},
+                             expect_errors=True)
+    assert_that(response.status_int, equal_to(500))
+    assert_that(response.json, has_entries({
+        'exception': {'TYPE': 'ValueError'},
+        'message': contains_string('not issued by this process')
+    }))
+
+
+@msgpack_only
+def test_gotodefinition_msgpack():
+    app = TestApp(handlers.app)
+    filepath = fixture_filepath('goto.py')
+    request_data = {
+        'source': read_file(filepath),
+        'line': 10,
+        'col': 3,
+        'source_path': filepath
+    }
+
+    response = app.post('/gotodefinition',
+                        codec.msgpack_dumps(request_data),
+                        headers={'Accept': 'application/msgpack'},
+                        content_type='application/msgpack')
+
+    assert_that(response.content_type, equal_to('application/msgpack'))
+    definitions = codec.msgpack_loads(response.body)['definitions']
+    assert_that(definitions, has_length(2))
+
+
+def test_request_too_large():
+    app = TestApp(handlers.app)
+    request_data = {
+        'source': 'x' * bottle.Request.MEMFILE_MAX,
+        'line': 1,
+        'col': 0,
+        'source_path': '/file.py'
+    }
+
+    response = app.post_json('/completions', request_data,
+                             expect_errors=True)
+
+    assert_that(response.status_int, equal_to(413))
+    assert_that(response.json['message'],
+                contains_string('Request body is larger than'))
+
+
+@msgpack_only
+def test_error_msgpack():
+    app = TestApp(handlers.app)
+    response = app.post('/resolve',
+                        codec.msgpack_dumps({'source_path': '/file.py',
+                                             'handle': '-1:0'}),
+                        headers={'Accept': 'application/msgpack'},
+                        content_type='application/msgpack',
+                        expect_errors=True)
+
+    assert_that(response.status_int, equal_to(500))
+    assert_that(codec.msgpack_loads(response.body),
+                has_entry('exception', {'TYPE': 'ValueError'}))
+
+
+def test_gotodefinition_script_cache():
+    app = TestApp(handlers.app)
+    filepath = fixture_filepath('goto.py')
+    request_data = {
+        'source': read_file(filepath),
+        'line': 10,
+        'col': 3,
+        'source_path': filepath
+    }
+
+    app.post_json('/gotodefinition', request_data)
+    hits = app.post_json('/debug/caches').json[0]['script_cache']['hits']
+    definitions = app.post_json('/gotodefinition',
+                                request_data).json['definitions']
+
+    assert_that(definitions, has_length(2))
+    assert_that(app.post_json('/debug/caches').json[0]['script_cache'],
+                has_entry('hits', hits + 1))
+
+
+def test_completion_open_document():
+    app = TestApp(handlers.app)
+    filepath = fixture_filepath('basic.py')
+    source = read_file(filepath).rstrip()[:-1]
+    app.post_json('/open_document', {
+        'source_path': filepath,
+        'source': source,
+        'version': 1
+    })
+    app.post_json('/change_document', {
+        'source_path': filepath,
+        'edits': [{
+            'start': {'line': 7, 'col': 1},
+            'end': {'line': 7, 'col': 1},
+            'text': '.'
+        }],
+        'version': 2
+    })
+
+    request_data = {
+        'line': 7,
+        'col': 2,
+        'source_path': filepath
+    }
+    completions = app.post_json('/completions',
+                                request_data).json['completions']
+
+    assert_that(completions, has_items(completion_entry('a'),
+                                       completion_entry('b')))
+
+    app.post_json('/close_document', {'source_path': filepath})
+    response = app.post_json('/completions',
+                             request_data,
+                             expect_errors=True)
+    assert_that(response.status_int, equal_to(500))
+
+
+def test_completion_superseded_request():
+    app = TestApp(handlers.app)
+    filepath = fixture_filepath('basic.py')
+    request_data = {
+        'source': read_file(filepath),
+        'line': 7,
+        'col': 2,
+        'source_path': filepath,
+        'request_generation': 2
+    }
+
+    response = app.post_json('/completions', request_data)
+    assert_that(response.status_int, equal_to(200))
+
+    request_data['request_generation'] = 1
+    response = app.post_json('/completions',
+                             request_data,
+                             expect_errors=True)
+    assert_that(response.status_int, equal_to(409))
+    assert_that(response.json, has_entry('message',
+                                         contains_string('superseded')))
+
+
+def test_completion_narrowing():
+    app = TestApp(handlers.app)
+    filepath = fixture_filepath('basic.py')
+    source = read_file(filepath).rstrip()
+    request_data = {
+        'source': source,
+        'line': 7,
+        'col': 2,
+        'source_path': filepath
+    }
+    app.post_json('/completions', request_data)
+    stats = app.post_json('/debug/caches').json[0]['completion_cache']
+
+    request_data['source'] = source + 'a'
+    request_data['col'] = 3
+    completions = app.post_json('/completions',
+                                request_data).json['completions']
+
+    assert_that(completions, contains(completion_entry('a')))
+    assert_that(app.post_json('/debug/caches').json[0]['completion_cache'],
+                has_entry('hits', stats['hits'] + 1))
+
+
 def test_good_gotodefinition():
     app = TestApp(handlers.app)
     filepath = fixture_filepath('goto.py')
@@ -294,6 +585,50 @@ def test_usages():
     ))
 
 
+def test_batch():
+    app = TestApp(handlers.app)
+    filepath = fixture_filepath('usages.py')
+    request_data = {
+        'source': read_file(filepath),
+        'line': 8,
+        'col': 5,
+        'source_path': filepath,
+        'operations': [
+            {'operation': 'gotodefinition'},
+            {'operation': 'gotoassignment', 'follow_imports': True},
+            {'operation': 'usages'}
+        ]
+    }
+
+    results = app.post_json('/batch', request_data).json['results']
+
+    assert_that(results, contains(
+        has_entry('definitions', contains(has_entries({'name': 'f',
+                                                       'line': 1,
+                                                       'column': 4}))),
+        has_entry('definitions', contains(has_entries({'name': 'f',
+                                                       'line': 1,
+                                                       'column': 4}))),
+        has_entry('definitions', has_length(4))
+    ))
+
+
+def test_batch_unknown_operation():
+    app = TestApp(handlers.app)
+    filepath = fixture_filepath('usages.py')
+    request_data = {
+        'source': read_file(filepath),
+        'line': 8,
+        'col': 5,
+        'source_path': filepath,
+        'operations': [{'operation': 'names'}]
+    }
+
+    response = app.post_json('/batch', request_data, expect_errors=True)
+
+    assert_that(response.status_int, equal_to(500))
+
+
 def test_names():
     app = TestApp(handlers.app)
     filepath = fixture_filepath('names.py')
@@ -353,7 +688,24 @@ def test_preload_module():
         'modules': ['os', 'sys']
     }
 
-    ok_(app.post_json('/preload_module', request_data))
+    job_id = app.post_json('/preload_module', request_data).json['job_id']
+    handlers.preload_queue.wait(job_id, 30)
+
+    assert_that(app.post_json('/preload_status', {'job_id': job_id}).json,
+                has_entries({
+                    'done': contains('os', 'sys'),
+                    'pending': empty(),
+                    'failed': empty()
+                }))
+
+
+def test_preload_status_unknown_job():
+    app = TestApp(handlers.app)
+    response = app.post_json('/preload_status',
+                             {'job_id': -1},
+                             expect_errors=True)
+
+    assert_that(response.status_int, equal_to(500))
 
 
 def test_usages_settings_additional_dynamic_modules():
@@ -414,6 +766,292 @@ def test_usages_settings_additional_dynamic_modules():
     ))
 
 
+def test_usages_settings_profile():
+    app = TestApp(handlers.app)
+    file2 = fixture_filepath('module', 'some_module', 'file2.py')
+    main_file = fixture_filepath('module', 'main.py')
+    app.post_json('/register_settings_profile', {
+        'name': 'dynamic',
+        'settings': {
+            'additional_dynamic_modules': [main_file]
+        }
+    })
+    request_data = {
+        'source': read_file(file2),
+        'line': 5,
+        'col': 17,
+        'source_path': file2,
+        'settings_profile': 'dynamic'
+    }
+
+    definitions = app.post_json('/usages',
+                                request_data).json['definitions']
+
+    assert_that(definitions, has_item(has_entries({
+        'module_path': main_file,
+        'name': 'FILE1_CONSTANT',
+        'line': 5,
+        'column': 11
+    })))
+
+
+def test_unknown_settings_profile():
+    app = TestApp(handlers.app)
+    filepath = fixture_filepath('basic.py')
+    request_data = {
+        'source': read_file(filepath),
+        'line': 7,
+        'col': 2,
+        'source_path': filepath,
+        'settings_profile': 'unknown'
+    }
+
+    response = app.post_json('/completions',
+                             request_data,
+                             expect_errors=True)
+
+    assert_that(response.status_int, equal_to(500))
+    assert_that(response.json['message'],
+                contains_string('Unknown settings profile unknown'))
+
+
+def test_workspace_symbols():
+    app = TestApp(handlers.app)
+    handlers.symbol_index = SymbolIndex(fixture_filepath('module'))
+    handlers.symbol_index.build()
+    try:
+        response = app.post_json('/workspace_symbols',
+                                 {'query': 'main_'}).json
+    finally:
+        handlers.symbol_index = None
+
+    assert_that(response, has_entries({
+        'symbols': contains(has_entries({
+            'name': 'main_function',
+            'type': 'function',
+            'module_path': fixture_filepath('module', 'main.py'),
+            'line': 4,
+            'column': 4
+        })),
+        'complete': True
+    }))
+
+
+def test_usages_symbol_index():
+    app = TestApp(handlers.app)
+    file2 = fixture_filepath('module', 'some_module', 'file2.py')
+    main_file = fixture_filepath('module', 'main.py')
+    request_data = {
+        'source': read_file(file2),
+        'line': 5,
+        'col': 17,
+        'source_path': file2
+    }
+    handlers.symbol_index = SymbolIndex(fixture_filepath('module'))
+    handlers.symbol_index.build()
+    try:
+        definitions = app.post_json('/usages',
+                                    request_data).json['definitions']
+    finally:
+        handlers.symbol_index = None
+
+    # main.py is not in the directory of a module used by file2.py.
+    assert_that(definitions, has_item(has_entries({
+        'module_path': main_file,
+        'name': 'FILE1_CONSTANT',
+        'line': 5,
+        'column': 11
+    })))
+
+
+def parsed_paths():
+    return set(path for paths in parso.cache.parser_cache.values()
+               for path in paths)
+
+
+def test_usages_symbol_index_parses_occurrences_only():
+    app = TestApp(handlers.app)
+    main_file = fixture_filepath('usages', 'main.py')
+    namespace_file = fixture_filepath('usages', 'lib', 'namespace.py')
+    request_data = {
+        'source': read_file(main_file),
+        'line': 5,
+        'col': 11,
+        'source_path': main_file
+    }
+    parso.cache.parser_cache.clear()
+    handlers.symbol_index = SymbolIndex(fixture_filepath('usages'))
+    handlers.symbol_index.build()
+    try:
+        definitions = app.post_json('/usages',
+                                    request_data).json['definitions']
+    finally:
+        handlers.symbol_index = None
+
+    # other/user.py assigns another NAME.
+    assert_that([(definition['module_path'], definition['line'])
+                 for definition in definitions], contains(
+        (fixture_filepath('usages', 'lib', 'constants.py'), 1),
+        (fixture_filepath('usages', 'lib', 'user.py'), 1),
+        (fixture_filepath('usages', 'lib', 'user.py'), 5),
+        (main_file, 1),
+        (main_file, 5)
+    ))
+    assert_that(parsed_paths(), has_item(
+        fixture_filepath('usages', 'other', 'user.py')))
+    # NAMESPACE contains NAME but is not an occurrence of it.
+    assert_that(parsed_paths(), is_not(has_item(namespace_file)))
+
+    # Without the index, Jedi parses the files of the directory of
+    # lib/constants.py containing NAME.
+    app.post_json('/usages', request_data)
+    assert_that(parsed_paths(), has_item(namespace_file))
+
+
+def test_usages_symbol_index_batch_and_script_cache():
+    app = TestApp(handlers.app)
+    main_file = fixture_filepath('usages', 'main.py')
+    request_data = {
+        # Not cached by another test.
+        'source': read_file(main_file) + '# batch\n',
+        'line': 5,
+        'col': 11,
+        'source_path': main_file
+    }
+    handlers.symbol_index = SymbolIndex(fixture_filepath('usages'))
+    handlers.symbol_index.build()
+    try:
+        app.post_json('/gotodefinition', request_data)
+        hits = handlers.script_cache.hits
+        usages = app.post_json('/usages', request_data).json
+        batch_data = dict(request_data,
+                          operations=[{'operation': 'usages'}])
+        results = app.post_json('/batch', batch_data).json['results']
+    finally:
+        handlers.symbol_index = None
+
+    # The script parsed by /gotodefinition is reused by both.
+    assert_that(handlers.script_cache.hits, equal_to(hits + 2))
+    assert_that(results, contains(equal_to(usages)))
+    assert_that(usages['definitions'], has_length(5))
+
+
+def test_usages_symbol_index_not_built():
+    app = TestApp(handlers.app)
+    main_file = fixture_filepath('usages', 'main.py')
+    request_data = {
+        'source': read_file(main_file),
+        'line': 5,
+        'col': 11,
+        'source_path': main_file
+    }
+    expected = app.post_json('/usages', request_data).json['definitions']
+
+    # Occurrences are missing until the index is built, so Jedi looks for
+    # usages in the directory of lib/constants.py as usual.
+    handlers.symbol_index = SymbolIndex(fixture_filepath('usages'))
+    try:
+        definitions = app.post_json('/usages',
+                                    request_data).json['definitions']
+    finally:
+        handlers.symbol_index = None
+
+    assert_that(definitions, equal_to(expected))
+    assert_that(definitions, has_item(has_entries({
+        'module_path': fixture_filepath('usages', 'lib', 'user.py'),
+        'line': 5
+    })))
+
+
+def test_invalidate_paths():
+    app = TestApp(handlers.app)
+    filepath = fixture_filepath('module', 'main.py')
+    request_data = {
+        'source': read_file(filepath),
+        'line': 5,
+        'col': 11,
+        'source_path': filepath
+    }
+
+    def cached_scripts():
+        return app.post_json('/debug/caches').json[0]['script_cache'][
+            'entries']
+
+    handlers.script_cache.invalidate(lambda key, script: True)
+    app.post_json('/gotodefinition', request_data)
+
+    handlers.invalidate_paths([fixture_filepath('goto.py')])
+    assert_that(cached_scripts(), equal_to(1))
+
+    # main.py imports file1.py.
+    handlers.invalidate_paths(
+        [fixture_filepath('module', 'some_module', 'file1.py')])
+    assert_that(cached_scripts(), equal_to(0))
+
+
+def test_invalidate_paths_completions():
+    app = TestApp(handlers.app)
+    root = tempfile.mkdtemp()
+    settings_file = os.path.join(root, 'settings.py')
+    main_file = os.path.join(root, 'main.py')
+    with open(settings_file, 'w') as source_file:
+        source_file.write('OLD = 1\n')
+
+    def complete(word):
+        source = 'import settings\nsettings.' + word
+        return app.post_json('/completions', {
+            'source': source,
+            'line': 2,
+            'col': len(source.splitlines()[1]),
+            'source_path': main_file
+        }).json['completions']
+
+    try:
+        assert_that(complete('NE'), empty())
+        with open(settings_file, 'w') as source_file:
+            source_file.write('OLD = 1\nNEW = 2\n')
+        handlers.invalidate_paths([settings_file])
+
+        # The cached completions of settings.NE didn't include any
+        # completion of settings.py.
+        assert_that(complete('NEW'), contains(completion_entry('NEW')))
+    finally:
+        shutil.rmtree(root)
+
+
+def test_debug_import_graph():
+    app = TestApp(handlers.app)
+    main_file = fixture_filepath('module', 'main.py')
+    file1 = fixture_filepath('module', 'some_module', 'file1.py')
+    file2 = fixture_filepath('module', 'some_module', 'file2.py')
+    handlers.symbol_index = SymbolIndex(fixture_filepath('module'))
+    handlers.symbol_index.build()
+    try:
+        response = app.post_json('/debug/import_graph',
+                                 {'paths': [file1]}).json
+    finally:
+        handlers.symbol_index = None
+
+    assert_that(response, equal_to({
+        'modules': {
+            file1: {
+                'imports': [],
+                'importers': [main_file, file2]
+            }
+        },
+        'complete': True
+    }))
+
+
+def test_workspace_symbols_without_project():
+    app = TestApp(handlers.app)
+    response = app.post_json('/workspace_symbols',
+                             {'query': 'main_'},
+                             expect_errors=True)
+
+    assert_that(response.status_int, equal_to(500))
+
+
 @py3only
 def test_py3():
     app = TestApp(handlers.app)
@@ -448,3 +1086,4 @@ def test_completion_socket_module():
 
     assert_that(completions, has_items(completion_entry('connect'),
                                        completion_entry('connect_ex')))
+    assert_that(handlers.resolved_modules.counts(), has_key('socket'))
@@ -0,0 +1,80 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from bottle import BaseRequest, Bottle, request
+from webob import Request
+from jedihttp import hmaclib
+from jedihttp.hmac_plugin import HmacPlugin
+from jedihttp.utils import request_body
+from hamcrest import assert_that, contains, equal_to, starts_with
+
+SECRET = b'secret'
+
+
+class UnreadableInput(object):
+
+    def read(self, *args):
+        raise AssertionError('The request body was read.')
+
+    readline = read
+
+
+def hmac_app():
+    app = Bottle()
+    app.config['jedihttp.hmac_secret'] = SECRET
+
+    @app.post('/echo')
+    def echo():
+        return request_body(request)
+
+    app.install(HmacPlugin())
+    return app
+
+
+def post_echo(body):
+    headers = {'Host': '127.0.0.1'}
+    hmaclib.JediHTTPHmacHelper(SECRET).sign_request_headers(headers,
+                                                            'POST',
+                                                            '/echo',
+                                                            body)
+    echo_request = Request.blank('/echo',
+                                 method='POST',
+                                 body=body,
+                                 headers=headers)
+    return echo_request.get_response(hmac_app())
+
+
+def test_authenticated_request():
+    response = post_echo(b'{"source": ""}')
+
+    assert_that(response.status_int, equal_to(200))
+    assert_that(response.body, equal_to(b'{"source": ""}'))
+
+
+def test_request_too_large_is_not_read():
+    echo_request = Request.blank('/echo',
+                                 method='POST',
+                                 headers={'Host': '127.0.0.1'})
+    echo_request.environ.update({
+        'CONTENT_LENGTH': str(BaseRequest.MEMFILE_MAX + 1),
+        'wsgi.input': UnreadableInput()
+    })
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(status)
+
+    # Request.get_response would read the body.
+    hmac_app()(echo_request.environ, start_response)
+
+    assert_that(statuses, contains(starts_with('413')))
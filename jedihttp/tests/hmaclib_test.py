@@ -0,0 +1,63 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import hashlib
+import hmac
+from base64 import b64decode
+from jedihttp.hmaclib import JediHTTPHmacHelper
+from hamcrest import assert_that, equal_to
+
+SECRET = b'secret'
+
+
+def sha256_hmac(content):
+    return hmac.new(SECRET, msg=content, digestmod=hashlib.sha256).digest()
+
+
+def test_sign_request_headers():
+    headers = {}
+    JediHTTPHmacHelper(SECRET).sign_request_headers(headers,
+                                                    'POST',
+                                                    u'/completions',
+                                                    b'{}')
+
+    # HMAC of the HMACs of the method, path and body.
+    expected = sha256_hmac(sha256_hmac(b'POST') +
+                           sha256_hmac(b'/completions') +
+                           sha256_hmac(b'{}'))
+    assert_that(b64decode(headers['x-jedihttp-hmac']), equal_to(expected))
+
+
+def test_is_request_authenticated():
+    hmachelper = JediHTTPHmacHelper(SECRET)
+    headers = {}
+    hmachelper.sign_request_headers(headers, 'POST', '/healthy', None)
+
+    assert_that(hmachelper.is_request_authenticated(headers,
+                                                    'POST',
+                                                    '/healthy',
+                                                    b''),
+                equal_to(True))
+    assert_that(hmachelper.is_request_authenticated(headers,
+                                                    'POST',
+                                                    '/ready',
+                                                    b''),
+                equal_to(False))
+
+
+def test_sign_response_headers():
+    headers = {}
+    JediHTTPHmacHelper(SECRET).sign_response_headers(headers, b'true')
+
+    assert_that(b64decode(headers['x-jedihttp-hmac']),
+                equal_to(sha256_hmac(b'true')))
@@ -0,0 +1,104 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import time
+from bottle import Bottle, abort
+from webtest import TestApp
+from jedihttp import timing
+from jedihttp.metrics_plugin import Histogram, MetricsPlugin
+from hamcrest import assert_that, contains, contains_string, equal_to
+
+
+def metrics_app():
+    app = Bottle()
+    lock = timing.TimedLock()
+
+    @app.post('/ok')
+    def ok():
+        with lock:
+            time.sleep(0.01)
+        return 'ok'
+
+    @app.post('/fail')
+    def fail():
+        abort(500, 'failed')
+
+    @app.post('/stream')
+    def stream():
+        def chunks():
+            yield 'a\n'
+            yield 'bc\n'
+        return chunks()
+
+    app.install(MetricsPlugin())
+    return TestApp(app)
+
+
+def test_histogram():
+    histogram = Histogram((1, 10))
+    for value in (0.5, 1, 5, 20):
+        histogram.observe(value)
+
+    assert_that(list(histogram.cumulative_counts()),
+                contains((1, 2), (10, 3), ('+Inf', 4)))
+    assert_that(histogram.sum, equal_to(26.5))
+
+
+def test_metrics():
+    app = metrics_app()
+    app.post('/ok', 'body')
+    app.post('/ok')
+    app.post('/fail', expect_errors=True)
+
+    metrics = app.get('/metrics')
+    assert_that(metrics.content_type, equal_to('text/plain'))
+    assert_that(metrics.text, contains_string(
+        'jedihttp_requests_total{route="/ok"} 2\n'))
+    assert_that(metrics.text, contains_string(
+        'jedihttp_request_errors_total{route="/ok"} 0\n'))
+    assert_that(metrics.text, contains_string(
+        'jedihttp_request_errors_total{route="/fail"} 1\n'))
+    assert_that(metrics.text, contains_string(
+        'jedihttp_request_bytes_bucket{route="/ok",le="100"} 2\n'))
+    assert_that(metrics.text, contains_string(
+        'jedihttp_request_bytes_sum{route="/ok"} 4\n'))
+    assert_that(metrics.text, contains_string(
+        'jedihttp_lock_hold_seconds_bucket{route="/ok",le="0.005"} 0\n'))
+    assert_that(metrics.text, contains_string(
+        'jedihttp_lock_wait_seconds_bucket{route="/ok",le="0.005"} 2\n'))
+    assert_that(metrics.text, contains_string('jedihttp_queue_depth 0\n'))
+
+
+def test_metrics_stream():
+    app = metrics_app()
+    assert_that(app.post('/stream').text, equal_to('a\nbc\n'))
+
+    metrics = app.get('/metrics').text
+    assert_that(metrics, contains_string(
+        'jedihttp_requests_total{route="/stream"} 1\n'))
+    assert_that(metrics, contains_string(
+        'jedihttp_response_bytes_sum{route="/stream"} 5\n'))
+    assert_that(metrics, contains_string(
+        'jedihttp_requests_in_progress{route="/stream"} 0\n'))
+
+
+def test_timed_lock():
+    lock = timing.TimedLock()
+    timing.reset_lock_times()
+    with lock:
+        time.sleep(0.01)
+
+    wait, hold = timing.lock_times()
+    assert_that(hold >= 0.01, equal_to(True))
+    assert_that(wait < hold, equal_to(True))
+    assert_that(timing.queue_depth(), equal_to(0))
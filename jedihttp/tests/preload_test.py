@@ -0,0 +1,92 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import threading
+from jedihttp.preload import ActivityTracker, PreloadQueue
+from hamcrest import assert_that, calling, contains, empty, equal_to, raises
+
+
+def test_preload_queue():
+    preloaded = []
+    queue = PreloadQueue(lambda modules, settings: preloaded.extend(modules))
+
+    job_id = queue.submit(['os', 'numpy', 'sys'])
+
+    assert_that(queue.wait(job_id, 5), equal_to(True))
+    assert_that(preloaded, contains('os', 'numpy', 'sys'))
+    assert_that(queue.status(job_id)['done'], contains('os', 'numpy', 'sys'))
+
+
+def test_preload_queue_failure():
+    def preload(modules, settings):
+        if modules == ['missing']:
+            raise ImportError(modules[0])
+
+    queue = PreloadQueue(preload)
+    job_id = queue.submit(['missing', 'os'])
+
+    assert_that(queue.wait(job_id, 5), equal_to(True))
+    status = queue.status(job_id)
+    assert_that(status['done'], contains('os'))
+    assert_that(status['failed'], contains('missing'))
+    assert_that(status['pending'], empty())
+
+
+def test_preload_queue_pending():
+    preload_event = threading.Event()
+    queue = PreloadQueue(lambda modules, settings: preload_event.wait())
+    job_id = queue.submit(['os', 'sys'])
+
+    assert_that(queue.is_finished(job_id), equal_to(False))
+    assert_that(queue.status()['pending'], contains('os', 'sys'))
+
+    preload_event.set()
+    assert_that(queue.wait(job_id, 5), equal_to(True))
+    assert_that(queue.status()['done'], contains('os', 'sys'))
+
+
+def test_preload_queue_forgets_finished_jobs():
+    queue = PreloadQueue(lambda modules, settings: None, max_jobs=1)
+    first_job_id = queue.submit(['os'])
+    queue.wait(first_job_id, 5)
+    second_job_id = queue.submit(['sys'])
+    queue.wait(second_job_id, 5)
+    queue.submit([])
+
+    assert_that(queue.is_finished(first_job_id), equal_to(True))
+    assert_that(calling(queue.status).with_args(first_job_id),
+                raises(ValueError))
+
+
+def test_preload_queue_waits_for_interactive_requests():
+    tracker = ActivityTracker()
+    preloaded = []
+    queue = PreloadQueue(lambda modules, settings: preloaded.extend(modules),
+                         lambda: tracker.wait_idle(5))
+
+    with tracker.active():
+        job_id = queue.submit(['os'])
+        assert_that(queue.wait(job_id, 0.1), equal_to(False))
+        assert_that(preloaded, empty())
+
+    assert_that(queue.wait(job_id, 5), equal_to(True))
+    assert_that(preloaded, contains('os'))
+
+
+def test_activity_tracker():
+    tracker = ActivityTracker()
+    with tracker.active():
+        with tracker.active():
+            assert_that(tracker.count(), equal_to(2))
+        assert_that(tracker.count(), equal_to(1))
+    assert_that(tracker.count(), equal_to(0))
@@ -0,0 +1,93 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import os
+import pstats
+import shutil
+import tempfile
+from bottle import Bottle
+from webtest import TestApp
+from jedihttp.profiler_plugin import ProfilerPlugin, profiling
+from hamcrest import assert_that, empty, equal_to, is_not, starts_with
+
+
+def profiled_function():
+    return sum(range(100))
+
+
+def profiler_app(profile_dir, sample_rate=0.0):
+    app = Bottle()
+
+    @app.post('/debug/sum')
+    def debug_sum():
+        return str(profiled_function())
+
+    @app.post('/stream')
+    def stream():
+        def chunks():
+            yield str(profiled_function())
+        return chunks()
+
+    app.install(ProfilerPlugin(profile_dir, sample_rate))
+    return TestApp(app)
+
+
+def assert_profiled(path):
+    functions = [function for _, _, function in pstats.Stats(path).stats]
+    assert_that(functions, is_not(empty()))
+    assert_that('profiled_function' in functions, equal_to(True))
+
+
+def test_profile_request_with_header():
+    profile_dir = tempfile.mkdtemp()
+    try:
+        app = profiler_app(profile_dir)
+        response = app.post('/debug/sum',
+                            headers={'X-JediHTTP-Profile': '1'})
+
+        assert_that(response.text, equal_to('4950'))
+        profile_file = response.headers['X-JediHTTP-Profile-File']
+        assert_that(profile_file, starts_with('debug_sum-'))
+        assert_that(os.listdir(profile_dir), equal_to([profile_file]))
+        assert_profiled(os.path.join(profile_dir, profile_file))
+    finally:
+        shutil.rmtree(profile_dir)
+
+
+def test_profile_request_without_header():
+    profile_dir = tempfile.mkdtemp()
+    try:
+        response = profiler_app(profile_dir).post('/debug/sum')
+
+        assert_that('X-JediHTTP-Profile-File' in response.headers,
+                    equal_to(False))
+        assert_that(os.listdir(profile_dir), empty())
+    finally:
+        shutil.rmtree(profile_dir)
+
+
+def test_profile_sampled_stream():
+    profile_dir = tempfile.mkdtemp()
+    try:
+        response = profiler_app(profile_dir, sample_rate=1.0).post('/stream')
+
+        assert_that(response.text, equal_to('4950'))
+        assert_profiled(os.path.join(
+            profile_dir, response.headers['X-JediHTTP-Profile-File']))
+    finally:
+        shutil.rmtree(profile_dir)
+
+
+def test_profiling_without_path():
+    with profiling(None):
+        profiled_function()
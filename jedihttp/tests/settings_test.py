@@ -0,0 +1,92 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import jedi
+import json
+import os
+import tempfile
+from jedihttp.settings import (AppliedSettings, SettingsProfiles,
+                               default_settings)
+from nose.tools import raises
+from hamcrest import assert_that, equal_to
+
+
+def test_settings_profiles_resolve():
+    profiles = SettingsProfiles()
+    profiles.register('fast', {'dynamic_params': False,
+                               'dynamic_array_additions': False})
+
+    assert_that(profiles.names(), equal_to(['fast']))
+    assert_that(profiles.resolve('fast', {'dynamic_params': True}),
+                equal_to({'dynamic_params': True,
+                          'dynamic_array_additions': False}))
+
+
+@raises(ValueError)
+def test_settings_profiles_unknown_profile():
+    SettingsProfiles().resolve('fast')
+
+
+@raises(ValueError)
+def test_settings_profiles_unknown_setting():
+    SettingsProfiles().register('fast', {'unknown_setting': True})
+
+
+def test_settings_profiles_load():
+    with tempfile.NamedTemporaryFile('w', suffix='.json',
+                                     delete=False) as profiles_file:
+        json.dump({'fast': {'dynamic_params': False},
+                   'slow': {'dynamic_params': True}}, profiles_file)
+    profiles = SettingsProfiles()
+    try:
+        profiles.load(profiles_file.name)
+    finally:
+        os.remove(profiles_file.name)
+
+    assert_that(profiles.names(), equal_to(['fast', 'slow']))
+    assert_that(profiles.resolve('fast'), equal_to({'dynamic_params': False}))
+
+
+def test_applied_settings():
+    applied = AppliedSettings()
+    default = default_settings['dynamic_params']
+    try:
+        applied.apply({'dynamic_params': not default})
+        assert_that(jedi.settings.dynamic_params, equal_to(not default))
+
+        # A setting already applied is not set again.
+        jedi.settings.dynamic_params = default
+        applied.apply({'dynamic_params': not default})
+        assert_that(jedi.settings.dynamic_params, equal_to(default))
+
+        applied.apply()
+        assert_that(jedi.settings.dynamic_params, equal_to(default))
+    finally:
+        jedi.settings.dynamic_params = default
+
+
+def test_applied_settings_overridden():
+    applied = AppliedSettings()
+    default = default_settings['dynamic_params']
+    try:
+        with applied.overridden('dynamic_params', not default):
+            assert_that(jedi.settings.dynamic_params, equal_to(not default))
+        assert_that(jedi.settings.dynamic_params, equal_to(default))
+
+        # The applied value is restored even if it isn't the default.
+        applied.apply({'dynamic_params': not default})
+        with applied.overridden('dynamic_params', default):
+            assert_that(jedi.settings.dynamic_params, equal_to(default))
+        assert_that(jedi.settings.dynamic_params, equal_to(not default))
+    finally:
+        jedi.settings.dynamic_params = default
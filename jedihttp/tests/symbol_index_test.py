@@ -0,0 +1,288 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+from .utils import fixture_filepath
+from jedihttp.symbol_index import SymbolIndex, identifier_at, parse_file
+from hamcrest import (assert_that, contains, empty, equal_to, has_entries,
+                      has_entry, is_not)
+
+SOURCE = """import os
+X = 1
+
+
+class A(object):
+    Y = 2
+
+    def method(self, argument):
+        local = 3
+        self.attribute = 4
+
+
+def function():
+    pass
+"""
+
+
+def test_parse_file():
+    indexed = parse_file(SOURCE)
+
+    assert_that(indexed['symbols'], contains(
+        ['X', 'statement', 2, 0],
+        ['A', 'class', 5, 6],
+        ['Y', 'statement', 6, 4],
+        ['method', 'function', 8, 8],
+        ['function', 'function', 13, 4]
+    ))
+    assert_that(indexed['identifiers'], has_entries({
+        'os': [1],
+        'self': [8, 10],
+        'attribute': [10]
+    }))
+    assert_that(indexed['imports'], equal_to(['os']))
+
+
+def test_parse_file_imports():
+    indexed = parse_file('import a.b, c as d\n'
+                         'from . import e\n'
+                         'from ..f import (g, h)\n'
+                         'def function():\n'
+                         '    import i\n')
+
+    assert_that(indexed['imports'], equal_to(
+        ['..f.g', '..f.h', '.e', 'a.b', 'c', 'i']))
+
+
+def test_identifier_at():
+    assert_that(identifier_at(SOURCE, 1, 7), equal_to('os'))
+    assert_that(identifier_at(SOURCE, 10, 9), equal_to('self'))
+    assert_that(identifier_at(SOURCE, 10, 12), equal_to('self'))
+    assert_that(identifier_at(SOURCE, 10, 19), equal_to('attribute'))
+    assert_that(identifier_at(SOURCE, 3, 0), equal_to(None))
+    assert_that(identifier_at(SOURCE, 100, 0), equal_to(None))
+
+
+def test_search():
+    index = SymbolIndex(fixture_filepath('module'))
+    index.build()
+    file1 = fixture_filepath('module', 'some_module', 'file1.py')
+
+    assert_that(index.is_complete(), equal_to(True))
+    # Names matching with the same case come first.
+    assert_that(index.search('file1_'), contains(
+        has_entries({
+            'name': 'file1_function',
+            'type': 'function',
+            'module_path': file1,
+            'line': 4,
+            'column': 4
+        }),
+        has_entries({'name': 'FILE1_CONSTANT'})
+    ))
+    assert_that(index.search('FILE1'), contains(
+        has_entries({'name': 'FILE1_CONSTANT'}),
+        has_entries({'name': 'file1_function'})
+    ))
+    assert_that(index.search('mfn', fuzzy=True), contains(
+        has_entries({'name': 'main_function'})
+    ))
+    assert_that(index.search('file1', max_results=1), contains(
+        has_entries({'name': 'file1_function'})
+    ))
+    assert_that(index.search('unknown'), empty())
+
+
+def test_occurrences():
+    index = SymbolIndex(fixture_filepath('module'))
+    index.build()
+    main_file = fixture_filepath('module', 'main.py')
+    file1 = fixture_filepath('module', 'some_module', 'file1.py')
+    file2 = fixture_filepath('module', 'some_module', 'file2.py')
+
+    assert_that(index.occurrences('FILE1_CONSTANT'), equal_to({
+        main_file: [1, 5],
+        file1: [1, 5],
+        file2: [1, 5]
+    }))
+    assert_that(index.occurrences('file1_function'),
+                has_entry(file1, [4]))
+    assert_that(index.occurrences('unknown'), empty())
+
+
+def test_index_file():
+    index_file = os.path.join(tempfile.mkdtemp(), 'index.json')
+    index = SymbolIndex(fixture_filepath('module'), index_file)
+    index.build()
+
+    loaded_index = SymbolIndex(fixture_filepath('module'), index_file)
+    loaded_index._load()
+    os.remove(index_file)
+
+    assert_that(loaded_index.is_complete(), equal_to(False))
+    assert_that(loaded_index.search('main_function'), is_not(empty()))
+
+
+def test_update_paths():
+    root = tempfile.mkdtemp()
+    module_path = os.path.join(root, 'module.py')
+    with open(module_path, 'w') as module_file:
+        module_file.write('def old_function():\n    pass\n')
+    index = SymbolIndex(root)
+    index.build()
+
+    os.remove(module_path)
+    new_module_path = os.path.join(root, 'new_module.py')
+    with open(new_module_path, 'w') as module_file:
+        module_file.write('def new_function():\n    old_function()\n')
+    index.update_paths([module_path,
+                        new_module_path,
+                        os.path.join(root, '.git', 'ignored.py'),
+                        os.path.join(root, 'README.md')])
+    os.remove(new_module_path)
+    os.rmdir(root)
+
+    assert_that(index.search('old_function'), empty())
+    assert_that(index.search('new_function'), contains(
+        has_entries({'name': 'new_function', 'module_path': new_module_path})))
+    assert_that(index.occurrences('old_function'),
+                equal_to({new_module_path: [2]}))
+
+
+def write_project(files):
+    """Write the files of |files|, a dict of their sources keyed by relative
+    path, in a temporary directory and return it."""
+    root = tempfile.mkdtemp()
+    for relative_path, source in files.items():
+        path = os.path.join(root, *relative_path.split('/'))
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as source_file:
+            source_file.write(source)
+    return root
+
+
+def test_update_paths_search_entries():
+    root = write_project({
+        'a.py': 'def Foo():\n    pass\n\n\ndef bar():\n    pass\n',
+        'b.py': 'def foo():\n    pass\n\n\ndef Bar():\n    pass\n',
+        'c.py': 'def bar():\n    pass\n'
+    })
+    try:
+        index = SymbolIndex(root)
+        index.build()
+
+        with open(os.path.join(root, 'b.py'), 'w') as source_file:
+            source_file.write('def Foo():\n    pass\n\n\ndef baz():\n'
+                              '    pass\n')
+        os.remove(os.path.join(root, 'c.py'))
+        with open(os.path.join(root, 'd.py'), 'w') as source_file:
+            source_file.write('def BAR():\n    pass\n')
+        index.update_paths([os.path.join(root, name)
+                            for name in ('b.py', 'c.py', 'd.py')])
+
+        built_index = SymbolIndex(root)
+        built_index.build()
+        assert_that(index._names, equal_to(built_index._names))
+        assert_that(index._keys, equal_to(built_index._keys))
+        assert_that(index._symbols_by_name,
+                    equal_to(built_index._symbols_by_name))
+        assert_that(index._files_by_identifier,
+                    equal_to(built_index._files_by_identifier))
+    finally:
+        shutil.rmtree(root)
+
+
+def test_import_graph():
+    root = write_project({
+        'settings.py': 'DEBUG = True\n',
+        'app.py': 'import os\nimport package.views\n',
+        'package/__init__.py': 'from . import models\n',
+        'package/models.py': 'from settings import DEBUG\n',
+        'package/views.py': 'from .models import Model\n',
+        'unrelated.py': 'import package.unknown\n'
+    })
+    try:
+        index = SymbolIndex(root)
+        index.build()
+
+        def path(relative_path):
+            return os.path.join(root, *relative_path.split('/'))
+
+        assert_that(index.import_graph(), has_entries({
+            path('app.py'): {
+                'imports': [path('package/views.py')],
+                'importers': []
+            },
+            path('package/models.py'): {
+                'imports': [path('settings.py')],
+                'importers': sorted([path('package/__init__.py'),
+                                     path('package/views.py')])
+            },
+            path('unrelated.py'): {
+                'imports': [path('package/__init__.py')],
+                'importers': []
+            }
+        }))
+        assert_that(index.importers([path('settings.py')]), equal_to(set([
+            path('settings.py'),
+            path('package/models.py'),
+            path('package/__init__.py'),
+            path('package/views.py'),
+            path('app.py'),
+            path('unrelated.py')
+        ])))
+        assert_that(index.importers([path('app.py')]),
+                    equal_to(set([path('app.py')])))
+        assert_that(index.import_graph([path('app.py'), path('unknown.py')]),
+                    contains(path('app.py')))
+    finally:
+        shutil.rmtree(root)
+
+
+def test_update_paths_import_graph():
+    root = write_project({
+        'app.py': 'import package.models\nimport settings\n',
+        'package/__init__.py': '',
+        'settings.py': 'DEBUG = True\n',
+        'other.py': 'import os\n'
+    })
+    try:
+        index = SymbolIndex(root)
+        index.build()
+
+        def path(relative_path):
+            return os.path.join(root, *relative_path.split('/'))
+
+        with open(path('package/models.py'), 'w') as source_file:
+            source_file.write('import settings\n')
+        os.remove(path('settings.py'))
+        with open(path('other.py'), 'w') as source_file:
+            source_file.write('from package import models\n')
+        index.update_paths([path('package/models.py'),
+                            path('settings.py'),
+                            path('other.py')])
+
+        built_index = SymbolIndex(root)
+        built_index.build()
+        assert_that(index.import_graph(),
+                    equal_to(built_index.import_graph()))
+        assert_that(index.import_graph()[path('app.py')]['imports'],
+                    equal_to([path('package/models.py')]))
+        assert_that(index._candidate_importers,
+                    equal_to(built_index._candidate_importers))
+    finally:
+        shutil.rmtree(root)
@@ -16,6 +16,7 @@
 
 
 import os
+import socket
 import subprocess
 import sys
 import time
@@ -34,6 +35,17 @@ except ImportError:
 py3only = unittest.skipIf(sys.version_info < (3, 0), "Python 3.x only test")
 py2only = unittest.skipIf(sys.version_info >= (3, 0), "Python 2.x only test")
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+msgpack_only = unittest.skipIf(msgpack is None, "msgpack is not installed")
+unix_only = unittest.skipIf(not hasattr(socket, 'AF_UNIX'),
+                            "Unix sockets only test")
+linux_only = unittest.skipIf(not sys.platform.startswith('linux'),
+                             "Linux only test")
+
 
 def python3():
     if on_windows():
@@ -0,0 +1,64 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+
+import json
+import os
+import tempfile
+from jedihttp.warmup import ModuleRecorder, read_modules, write_modules
+from hamcrest import assert_that, contains, empty, equal_to, has_entries
+
+
+class FakeEvaluator(object):
+    def __init__(self, modules):
+        self.modules = dict((module, None) for module in modules)
+
+
+class FakeScript(object):
+    def __init__(self, modules):
+        self._evaluator = FakeEvaluator(modules)
+
+
+def temporary_path():
+    handle, path = tempfile.mkstemp(suffix='.json')
+    os.close(handle)
+    os.remove(path)
+    return path
+
+
+def test_module_recorder():
+    recorder = ModuleRecorder()
+    recorder.record(FakeScript(['__main__', 'os', 'numpy']))
+    recorder.record(FakeScript(['numpy']))
+    recorder.record(object())
+
+    assert_that(recorder.counts(), equal_to({'os': 1, 'numpy': 2}))
+
+
+def test_write_and_read_modules():
+    path = temporary_path()
+    try:
+        write_modules(path, [{'os': 1, 'numpy': 2}, {'os': 3}])
+        assert_that(read_modules(path), contains('os', 'numpy'))
+
+        # Counts of previous sessions are halved.
+        write_modules(path, [{'numpy': 1}])
+        with open(path) as warmup_file:
+            assert_that(json.load(warmup_file)['modules'],
+                        has_entries({'os': 2, 'numpy': 2}))
+    finally:
+        os.remove(path)
+
+
+def test_read_modules_missing_file():
+    assert_that(read_modules(temporary_path()), empty())
@@ -0,0 +1,149 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+
+from __future__ import absolute_import
+
+import os
+import pstats
+import shutil
+import signal
+import tempfile
+from .utils import fixture_filepath, linux_only, read_file
+from jedihttp.workers import WorkerPool
+from nose.tools import raises
+from hamcrest import (assert_that, calling, has_entry, has_items, equal_to,
+                      raises as raises_matcher)
+
+
+def test_worker_pool_run():
+    pool = WorkerPool(2)
+    try:
+        filepath = fixture_filepath('basic.py')
+        request_data = {
+            'source': read_file(filepath),
+            'line': 7,
+            'col': 2,
+            'source_path': filepath
+        }
+
+        completions = pool.run('completions',
+                               request_data,
+                               filepath)['completions']
+
+        assert_that(completions, has_items(has_entry('name', 'a'),
+                                           has_entry('name', 'b')))
+    finally:
+        pool.shutdown()
+
+
+def test_worker_pool_stream():
+    pool = WorkerPool(1)
+    try:
+        filepath = fixture_filepath('basic.py')
+        request_data = {
+            'source': read_file(filepath),
+            'line': 7,
+            'col': 2,
+            'source_path': filepath
+        }
+
+        completions = pool.stream('completions', request_data, filepath)
+        assert_that(next(completions), has_entry('name', 'a'))
+        completions.close()
+
+        # The items left by the closed stream must not be read by the next
+        # operation.
+        assert_that(pool.run('preload_module', {'modules': ['os']}),
+                    equal_to(True))
+    finally:
+        pool.shutdown()
+
+
+def test_worker_pool_broadcast():
+    pool = WorkerPool(2)
+    try:
+        results = pool.broadcast('preload_module', {'modules': ['os']})
+        assert_that(results, equal_to([True, True]))
+    finally:
+        pool.shutdown()
+
+
+@raises(ValueError)
+def test_worker_pool_reraise_exception():
+    pool = WorkerPool(1)
+    try:
+        filepath = fixture_filepath('goto.py')
+        pool.run('gotodefinition', {
+            'source': read_file(filepath),
+            'line': 100,
+            'col': 1,
+            'source_path': filepath
+        }, filepath)
+    finally:
+        pool.shutdown()
+
+
+@raises(ValueError)
+def test_worker_pool_resolve_handle_of_another_worker():
+    pool = WorkerPool(2)
+    try:
+        filepath = fixture_filepath('basic.py')
+        handle = pool.run('completions', {
+            'source': read_file(filepath),
+            'line': 7,
+            'col': 2,
+            'source_path': filepath,
+            'docstrings': False
+        }, filepath)['completions'][0]['handle']
+        other_path = [path for path in ('/a.py', '/b.py', '/c.py', '/d.py')
+                      if pool._worker_index(path) !=
+                      pool._worker_index(filepath)][0]
+
+        # The other worker may have issued a handle with the same token.
+        pool.run('resolve', {'handle': handle}, other_path)
+    finally:
+        pool.shutdown()
+
+
+@linux_only
+def test_worker_pool_restart_dead_worker():
+    pool = WorkerPool(1)
+    try:
+        worker = pool._workers[0]
+        os.kill(worker._process.pid, signal.SIGKILL)
+        worker._process.join(5)
+
+        assert_that(calling(pool.run).with_args('preload_module',
+                                                {'modules': ['os']}),
+                    raises_matcher(RuntimeError, 'died'))
+        assert_that(pool.run('preload_module', {'modules': ['os']}),
+                    equal_to(True))
+    finally:
+        pool.shutdown()
+
+
+def test_worker_pool_profile():
+    pool = WorkerPool(1)
+    profile_dir = tempfile.mkdtemp()
+    try:
+        profile = os.path.join(profile_dir, 'worker.pstats')
+        assert_that(pool.run('preload_module',
+                             {'modules': ['os']},
+                             profile=profile),
+                    equal_to(True))
+
+        assert_that(pstats.Stats(profile).total_calls > 0, equal_to(True))
+    finally:
+        pool.shutdown()
+        shutil.rmtree(profile_dir)
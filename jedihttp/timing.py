@@ -0,0 +1,75 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import time
+from threading import Lock, local
+
+# Time spent by the current thread waiting for and holding TimedLocks since the
+# last call to reset_lock_times.
+_lock_times = local()
+
+# Number of threads waiting for a TimedLock.
+_waiting = [0]
+_waiting_lock = Lock()
+
+
+def reset_lock_times():
+    _lock_times.wait = 0.0
+    _lock_times.hold = 0.0
+
+
+def lock_times():
+    """Return the time in seconds spent by the current thread waiting for and
+    holding TimedLocks since the last call to reset_lock_times."""
+    return (getattr(_lock_times, 'wait', 0.0),
+            getattr(_lock_times, 'hold', 0.0))
+
+
+def queue_depth():
+    """Return the number of threads waiting for a TimedLock."""
+    with _waiting_lock:
+        return _waiting[0]
+
+
+def _add_lock_time(name, seconds):
+    setattr(_lock_times, name, getattr(_lock_times, name, 0.0) + seconds)
+
+
+def _add_waiting(count):
+    with _waiting_lock:
+        _waiting[0] += count
+
+
+class TimedLock(object):
+    """Lock, used as a context manager, recording the time the current thread
+    spends waiting for it and holding it."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._acquire_time = None
+
+    def __enter__(self):
+        start = time.time()
+        _add_waiting(1)
+        try:
+            self._lock.acquire()
+        finally:
+            _add_waiting(-1)
+        # Only the thread holding the lock sets and reads the acquire time.
+        self._acquire_time = time.time()
+        _add_lock_time('wait', self._acquire_time - start)
+        return self
+
+    def __exit__(self, *exc_info):
+        _add_lock_time('hold', time.time() - self._acquire_time)
+        self._lock.release()
@@ -13,6 +13,15 @@
 
 import os
 import sys
+from io import BytesIO
+
+try:
+    import httplib
+except ImportError:
+    from http import client as httplib
+
+# Key of the request environ holding the body of the request.
+REQUEST_BODY_KEY = 'jedihttp.request_body'
 
 
 def add_vendor_folder_to_sys_path():
@@ -21,3 +30,77 @@ def add_vendor_folder_to_sys_path():
     for folder in os.listdir(vendor_folder):
         sys.path.insert(0, os.path.realpath(os.path.join(vendor_folder,
                                                          folder)))
+
+
+def parse_header_qualities(header):
+    """Return the quality of each value of an Accept or Accept-Encoding
+    |header|, keyed by the value in lowercase."""
+    qualities = {}
+    for entry in (header or '').split(','):
+        parameters = entry.split(';')
+        name = parameters[0].strip().lower()
+        quality = 1.0
+        for parameter in parameters[1:]:
+            key, _, value = parameter.strip().partition('=')
+            if key.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            qualities[name] = quality
+    return qualities
+
+
+def is_skipped_directory(name):
+    """Return whether the directory |name| is skipped when looking for the
+    Python files of a project: hidden directories and bytecode caches."""
+    return name.startswith('.') or name == '__pycache__'
+
+
+def python_files(root):
+    """Yield the paths of the Python files under |root|, skipping the
+    directories for which is_skipped_directory is true."""
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories[:] = sorted(subdirectory
+                                   for subdirectory in subdirectories
+                                   if not is_skipped_directory(subdirectory))
+        for filename in sorted(filenames):
+            if filename.endswith('.py'):
+                yield os.path.join(directory, filename)
+
+
+def request_body(request):
+    """Return the body of the Bottle |request| as bytes. It is read once and
+    shared by the plugins and the handlers through the REQUEST_BODY_KEY key of
+    the request environ, where plugins transforming the body, like
+    CompressionPlugin, replace it. Abort with the REQUEST_ENTITY_TOO_LARGE
+    status code if the body is larger than request.MEMFILE_MAX, before
+    reading it when its length is known."""
+    environ = request.environ
+    body = environ.get(REQUEST_BODY_KEY)
+    if body is not None:
+        return body
+    max_bytes = request.MEMFILE_MAX
+    if request.content_length > max_bytes:
+        _abort_too_large(max_bytes)
+    if request.chunked or 'bottle.request.body' in environ:
+        body = request.body.read(max_bytes + 1)
+    else:
+        # Read the input at once instead of letting Bottle copy it in chunks,
+        # to a temporary file past 100KB. Bottle reads request.body from
+        # there if needed.
+        body = environ['wsgi.input'].read(max(0, request.content_length))
+        environ['wsgi.input'] = BytesIO(body)
+    if len(body) > max_bytes:
+        _abort_too_large(max_bytes)
+    environ[REQUEST_BODY_KEY] = body
+    return body
+
+
+def _abort_too_large(max_bytes):
+    # Bottle may be in the vendor folder, not in sys.path yet when this module
+    # is imported.
+    from bottle import abort
+    abort(httplib.REQUEST_ENTITY_TOO_LARGE,
+          'Request body is larger than {0} bytes.'.format(max_bytes))
@@ -0,0 +1,77 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import json
+import os
+from jedihttp.compatibility import iteritems
+
+# Maximum number of modules kept in a warm-up file.
+MAX_MODULES = 100
+
+
+class ModuleRecorder(object):
+    """Count how many times each module is resolved by Jedi during a session.
+    This class is not thread safe."""
+
+    def __init__(self):
+        self._counts = {}
+
+    def record(self, script):
+        # Jedi keeps the modules resolved by a script in its evaluator, like
+        # sys.modules. This is not part of the Jedi API so nothing is recorded
+        # if it changes.
+        evaluator = getattr(script, '_evaluator', None)
+        for name in getattr(evaluator, 'modules', ()):
+            if name != '__main__':
+                self._counts[name] = self._counts.get(name, 0) + 1
+
+    def counts(self):
+        return dict(self._counts)
+
+
+def _read_counts(path):
+    try:
+        with open(path) as warmup_file:
+            counts = json.load(warmup_file)['modules']
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+        return {}
+    return counts if isinstance(counts, dict) else {}
+
+
+def read_modules(path):
+    """Return the modules recorded in the warm-up file at |path|, most used
+    first."""
+    counts = _read_counts(path)
+    return sorted(counts, key=lambda name: (-counts[name], name))
+
+
+def write_modules(path, sessions_counts):
+    """Merge the counts of the modules resolved in each Jedi process into the
+    warm-up file at |path|. Counts of previous sessions are halved so that
+    modules no longer used eventually drop out of the file."""
+    counts = dict((name, count // 2)
+                  for name, count in iteritems(_read_counts(path)))
+    for session_counts in sessions_counts:
+        for name, count in iteritems(session_counts):
+            counts[name] = counts.get(name, 0) + count
+    kept = sorted((name for name in counts if counts[name] > 0),
+                  key=lambda name: (-counts[name], name))[:MAX_MODULES]
+
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'w') as warmup_file:
+        json.dump({'modules': dict((name, counts[name]) for name in kept)},
+                  warmup_file)
+    # os.rename doesn't overwrite an existing file on Windows.
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(temporary_path, path)
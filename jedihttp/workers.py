@@ -0,0 +1,335 @@
+#     Copyright 2017 Cedraro Andrea <a.cedraro@gmail.com>
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import errno
+import itertools
+import logging
+import multiprocessing
+import os
+import pickle
+import signal
+import sys
+import time
+import traceback
+import zlib
+from multiprocessing.connection import Client, Listener
+from jedihttp.compatibility import encode_string
+from jedihttp.profiler_plugin import profiling
+from jedihttp.timing import TimedLock
+
+# Kinds of the messages sent back by a worker.
+_RESULT = 'result'
+_ITEM = 'item'
+_END = 'end'
+_ERROR = 'error'
+
+# Workers must not be forked from the server: it runs several threads and a
+# forked process may inherit locks held by them, like the ones of logging or
+# of the caches, and deadlock. On Python 3, they are forked from the
+# forkserver process or, where it is not available, started from a fresh
+# interpreter. Python 2 has neither, so they are forked from a spare process,
+# see _Spares, except on Windows where processes are never forked.
+if hasattr(multiprocessing, 'get_context'):
+    _CONTEXT = multiprocessing.get_context(
+        'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods()
+        else 'spawn')
+    # Import Jedi once in the forkserver process instead of in every worker.
+    if _CONTEXT.get_start_method() == 'forkserver':
+        _CONTEXT.set_forkserver_preload(['jedihttp.handlers'])
+    _USE_SPARES = False
+else:
+    _CONTEXT = multiprocessing
+    _USE_SPARES = sys.platform != 'win32'
+
+
+def _picklable_exception(exception):
+    try:
+        pickle.dumps(exception)
+        return exception
+    except Exception:
+        return RuntimeError('{0}: {1}'.format(type(exception).__name__,
+                                              exception))
+
+
+def _spare_main(address, authkey, initializer, initargs):
+    """Entry point of the spare process of a pool on Python 2. Once
+    initialized, it connects to the pool and forks a worker for each accepted
+    connection. It only runs this thread, so the workers forked from it are
+    clean. It exits when the pool is closed."""
+    from jedihttp import utils
+    utils.add_vendor_folder_to_sys_path()
+    from jedihttp import handlers  # noqa
+
+    if initializer:
+        initializer(*initargs)
+    # Workers are reaped as soon as they exit.
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    while True:
+        try:
+            connection = Client(address, authkey=authkey)
+        except Exception:
+            return
+        if os.fork() == 0:
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            try:
+                connection.send(os.getpid())
+                _worker_main(connection, None, ())
+            finally:
+                os._exit(0)
+        connection.close()
+
+
+def _worker_main(connection, initializer, initargs):
+    """Entry point of a worker process. Operations are received from
+    |connection| and run with handlers.run_operation, or
+    handlers.stream_operation for streamed ones, until None is received. They
+    are profiled when they come with the path of a profile."""
+    from jedihttp import utils
+    utils.add_vendor_folder_to_sys_path()
+    from jedihttp import handlers
+
+    if initializer:
+        initializer(*initargs)
+
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        operation, request_data, stream, profile = message
+        try:
+            # The last message is sent once the profile is written.
+            with profiling(profile):
+                reply = _run(connection, handlers, operation, request_data,
+                             stream)
+            connection.send(reply)
+        except Exception as error:
+            connection.send((_ERROR,
+                             _picklable_exception(error),
+                             traceback.format_exc()))
+
+
+def _run(connection, handlers, operation, request_data, stream):
+    """Run |operation| and return the last message to send back. Items of a
+    streamed operation are sent as they come."""
+    if stream:
+        for item in handlers.stream_operation(operation, request_data):
+            connection.send((_ITEM, item, None))
+        return _END, None, None
+    return _RESULT, handlers.run_operation(operation, request_data), None
+
+
+class _SpareWorkerProcess(object):
+    """Process of a worker forked from a spare process, with the interface of
+    multiprocessing.Process used by Worker."""
+
+    def __init__(self, pid):
+        self.pid = pid
+
+    def is_alive(self):
+        try:
+            os.kill(self.pid, 0)
+        except OSError as error:
+            return error.errno != errno.ESRCH
+        return True
+
+    def join(self, timeout):
+        expiration = time.time() + timeout
+        while self.is_alive() and time.time() < expiration:
+            time.sleep(0.05)
+
+    def terminate(self):
+        try:
+            os.kill(self.pid, signal.SIGTERM)
+        except OSError:
+            pass
+
+
+class _Spares(object):
+    """Spare process of a pool on Python 2, forked when the pool starts,
+    before the server runs other threads, and forking the workers of the
+    pool, including the ones started again after dying."""
+
+    def __init__(self, initializer, initargs):
+        authkey = os.urandom(32)
+        self._listener = Listener(family='AF_UNIX', authkey=authkey)
+        self._process = multiprocessing.Process(
+            target=_spare_main,
+            name='jedihttp-spare',
+            args=(self._listener.address, authkey, initializer, initargs))
+        self._process.daemon = True
+        self._process.start()
+
+    def start_worker(self):
+        """Return the connection to a new worker and its process."""
+        if not self._process.is_alive():
+            raise RuntimeError('The spare process of the Jedi workers died.')
+        connection = self._listener.accept()
+        return connection, _SpareWorkerProcess(connection.recv())
+
+    def close(self, timeout=5):
+        self._listener.close()
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+
+
+class Worker(object):
+    """A Jedi worker process with its own Jedi state. Only one operation at a
+    time is sent to the process. If |spares| is given, the process is forked
+    from its spare process."""
+
+    def __init__(self, index, initializer, initargs, spares=None):
+        self._logger = logging.getLogger(__name__)
+        self._index = index
+        self._initializer = initializer
+        self._initargs = initargs
+        self._spares = spares
+        self._lock = TimedLock()
+        self._start()
+
+    def _start(self):
+        if self._spares:
+            self._connection, self._process = self._spares.start_worker()
+            return
+        self._connection, child_connection = _CONTEXT.Pipe()
+        self._process = _CONTEXT.Process(
+            target=_worker_main,
+            name='jedihttp-worker-{0}'.format(self._index),
+            args=(child_connection, self._initializer, self._initargs))
+        self._process.daemon = True
+        self._process.start()
+        child_connection.close()
+
+    def _restart(self):
+        self._logger.warning('Jedi worker %s died, restarting it.',
+                             self._index)
+        self.stop()
+        self._start()
+
+    def _send(self, operation, request_data, stream, profile):
+        try:
+            self._connection.send((operation, request_data, stream, profile))
+        except (IOError, OSError):
+            self._died(operation)
+
+    def _receive(self, operation):
+        try:
+            kind, payload, error_traceback = self._connection.recv()
+        except (EOFError, IOError, OSError):
+            self._died(operation)
+        if kind == _ERROR:
+            self._logger.debug('Jedi worker %s raised:\n%s',
+                               self._index, error_traceback)
+            raise payload
+        return kind, payload
+
+    def _died(self, operation):
+        self._restart()
+        raise RuntimeError('Jedi worker {0} died while running '
+                           '{1}.'.format(self._index, operation))
+
+    def run(self, operation, request_data, check=None, profile=None):
+        with self._lock:
+            if check:
+                check()
+            self._send(operation, request_data, False, profile)
+            return self._receive(operation)[1]
+
+    def stream(self, operation, request_data, check=None, profile=None):
+        with self._lock:
+            if check:
+                check()
+            self._send(operation, request_data, True, profile)
+            kind = None
+            try:
+                kind, payload = self._receive(operation)
+                while kind != _END:
+                    yield payload
+                    kind, payload = self._receive(operation)
+            except Exception:
+                # The worker sends nothing after an error.
+                kind = _END
+                raise
+            finally:
+                # Drain the items the consumer did not ask for so that the
+                # next operation reads its own results.
+                while kind != _END:
+                    kind, payload = self._receive(operation)
+
+    def stop(self, timeout=5):
+        try:
+            self._connection.send(None)
+        except (IOError, OSError):
+            pass
+        self._connection.close()
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+
+
+class WorkerPool(object):
+    """Pool of |num_workers| Jedi worker processes. Requests are routed to a
+    worker based on an affinity key, usually the path of the file, so that the
+    same buffer keeps hitting a worker where Jedi state is already warm.
+    |initializer| is called with |initargs| in each worker when it starts."""
+
+    def __init__(self, num_workers, initializer=None, initargs=()):
+        self._spares = (_Spares(initializer, initargs) if _USE_SPARES
+                        else None)
+        self._workers = [Worker(index, initializer, initargs, self._spares)
+                         for index in range(num_workers)]
+        self._round_robin = itertools.count()
+
+    def __len__(self):
+        return len(self._workers)
+
+    def _worker_index(self, affinity):
+        if affinity is None:
+            return next(self._round_robin) % len(self._workers)
+        # zlib.crc32 returns a signed integer on Python 2.
+        checksum = zlib.crc32(encode_string(affinity)) & 0xffffffff
+        return checksum % len(self._workers)
+
+    def run(self, operation, request_data, affinity=None, check=None,
+            profile=None):
+        """Run |operation| on the worker matching |affinity| and return its
+        result. Exceptions raised by the operation are raised again here. If
+        given, |check| is called once the worker is available, right before
+        sending the operation; it may raise to cancel the operation. If
+        |profile| is given, the worker profiles the operation and writes the
+        statistics to that path."""
+        worker = self._workers[self._worker_index(affinity)]
+        return worker.run(operation, request_data, check, profile)
+
+    def stream(self, operation, request_data, affinity=None, check=None,
+               profile=None):
+        """Same as run for operations producing their results one at a time.
+        Return a generator of the results. The worker is held until the
+        generator is exhausted or closed."""
+        worker = self._workers[self._worker_index(affinity)]
+        return worker.stream(operation, request_data, check, profile)
+
+    def broadcast(self, operation, request_data):
+        """Run |operation| on every worker and return the list of results."""
+        return [worker.run(operation, request_data)
+                for worker in self._workers]
+
+    def shutdown(self):
+        for worker in self._workers:
+            worker.stop()
+        if self._spares:
+            self._spares.close()
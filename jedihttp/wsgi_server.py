@@ -13,24 +13,30 @@
 
 from jedihttp.compatibility import listvalues
 from waitress.server import TcpWSGIServer
+import os
 import select
 
+try:
+    from waitress.server import UnixWSGIServer
+except ImportError:
+    # Platforms without Unix sockets.
+    UnixWSGIServer = None
 
-class StoppableWSGIServer(TcpWSGIServer):
-    """StoppableWSGIServer is a subclass of the TcpWSGIServer Waitress server
-    with a shutdown method. It is based on StopableWSGIServer class from
-    webtest: https://github.com/Pylons/webtest/blob/master/webtest/http.py"""
+
+class StoppableServerMixin(object):
+    """Mixin adding a shutdown method to a Waitress server. It is based on
+    StopableWSGIServer class from webtest:
+    https://github.com/Pylons/webtest/blob/master/webtest/http.py"""
 
     shutdown_requested = False
 
     def start(self):
-        """Wrapper of TcpWSGIServer run method. It prevents a traceback from
-        asyncore."""
+        """Wrapper of the Waitress server run method. It prevents a traceback
+        from asyncore."""
 
         # Message for compatibility with clients who expect the output from
         # waitress.serve here.
-        print('serving on http://{0}:{1}'.format(self.effective_host,
-                                                 self.effective_port))
+        print('serving on {0}'.format(self.url()))
 
         try:
             self.run()
@@ -47,7 +53,48 @@ class StoppableWSGIServer(TcpWSGIServer):
         # We can't use an iterator here because _map is modified while looping
         # through it.
         # NOTE: _map is an attribute from the asyncore.dispatcher class, which
-        # is a base class of TcpWSGIServer. This may change in future versions
-        # of waitress so extra care should be taken when updating waitress.
+        # is a base class of the Waitress servers. This may change in future
+        # versions of waitress so extra care should be taken when updating
+        # waitress.
         for channel in listvalues(self._map):
             channel.close()
+
+
+class StoppableWSGIServer(StoppableServerMixin, TcpWSGIServer):
+    """StoppableWSGIServer is a subclass of the TcpWSGIServer Waitress server
+    with a shutdown method."""
+
+    def url(self):
+        return 'http://{0}:{1}'.format(self.effective_host,
+                                       self.effective_port)
+
+
+if UnixWSGIServer is not None:
+
+    class StoppableUnixWSGIServer(StoppableServerMixin, UnixWSGIServer):
+        """Subclass of the UnixWSGIServer Waitress server, listening on the
+        Unix socket |unix_socket|, with a shutdown method. Only the owner of
+        the server can read and write the socket."""
+
+        def __init__(self, application, unix_socket, **kwargs):
+            # Waitress changes the permissions of the socket after creating
+            # it; the umask makes sure they are never wider.
+            umask = os.umask(0o177)
+            try:
+                super(StoppableUnixWSGIServer, self).__init__(
+                    application,
+                    unix_socket=unix_socket,
+                    unix_socket_perms='600',
+                    **kwargs)
+            finally:
+                os.umask(umask)
+
+        def url(self):
+            return 'unix:{0}'.format(self.adj.unix_socket)
+
+        def shutdown(self):
+            super(StoppableUnixWSGIServer, self).shutdown()
+            try:
+                os.remove(self.adj.unix_socket)
+            except OSError:
+                pass